@@ -0,0 +1,143 @@
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+import degrees
+from graph import TreeCache
+
+# Queries handed to a worker at a time
+CHUNKSIZE = 64
+
+# TreeCache of this process, if BFS trees are being cached
+cache = None
+
+# Barrier of every worker in the pool, so each reports its stats once
+barrier = None
+
+
+def main():
+    # split positional arguments from --workers=N and --cache=MB
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    options = dict(arg[2:].split("=", 1) for arg in sys.argv[1:]
+                   if arg.startswith("--") and "=" in arg)
+    if len(args) > 2 or not set(options) <= {"workers", "cache"}:
+        sys.exit("Usage: python batch.py [directory] [queries] "
+                 "[--workers=N] [--cache=MB]")
+    directory = args[0] if len(args) > 0 else "large"
+    queries = args[1] if len(args) > 1 else "-"
+    workers = int(options.get("workers", os.cpu_count()))
+    cache_bytes = int(options.get("cache", 0)) * 2 ** 20
+
+    # Load the graph once, workers share its pages
+    print("Loading data...", file=sys.stderr)
+    degrees.load_data(directory, snapshot=True)
+    print("Data loaded.", file=sys.stderr)
+
+    f = sys.stdin if queries == "-" else open(queries, encoding="utf-8")
+    start = time.perf_counter()
+    count = 0
+    stats = []
+    with f:
+        for line in answer_all(f, directory, workers, cache_bytes, stats):
+            print(line)
+            count += 1
+    elapsed = time.perf_counter() - start
+    rate = count / elapsed if elapsed else 0
+    print(f"{count} queries in {elapsed:.2f}s ({rate:.1f} queries/s)",
+          file=sys.stderr)
+    if stats:
+        total = {key: sum(worker[key] for worker in stats) for key in stats[0]}
+        print(f"Tree cache ({len(stats)} workers): {total}", file=sys.stderr)
+
+
+def answer_all(lines, directory, workers, cache_bytes=0, stats=None):
+    """
+    Yields one JSON answer per query line, in input order.
+
+    Queries are answered by a pool of `workers` processes. Forked workers
+    inherit the already loaded graph; otherwise each memory-maps the same
+    snapshot, so the graph is only ever held in memory once. Each worker
+    keeps its own tree cache, and if `stats` is a list the stats of every
+    worker's cache are appended to it once all queries are answered.
+    """
+    lines = (line for line in lines if line.strip())
+    if workers <= 1:
+        init_worker(directory, cache_bytes)
+        yield from map(answer, lines)
+        if stats is not None and cache is not None:
+            stats.append(cache.stats())
+        return
+
+    with multiprocessing.Pool(
+        workers, initializer=init_worker,
+        initargs=(directory, cache_bytes, multiprocessing.Barrier(workers))
+    ) as pool:
+        yield from pool.imap(answer, lines, CHUNKSIZE)
+        if stats is not None and cache_bytes:
+            stats.extend(pool.map(worker_stats, range(workers), 1))
+
+
+def init_worker(directory, cache_bytes=0, worker_barrier=None):
+    """
+    Makes sure a worker process has the graph loaded, and gives it a
+    tree cache of `cache_bytes` if that is non-zero.
+    """
+    global cache, barrier
+    if degrees.graph is None:
+        degrees.load_data(directory, snapshot=True)
+    cache = TreeCache(degrees.graph, cache_bytes) if cache_bytes else None
+    barrier = worker_barrier
+
+
+def worker_stats(_):
+    """
+    Returns the stats of this worker's tree cache. Waits until every
+    worker has taken one of these tasks, so no worker takes two.
+    """
+    barrier.wait()
+    return cache.stats()
+
+
+def answer(line):
+    """
+    Answers one query line of the form "source<TAB>target", where each
+    side is an IMDB person id or an unambiguous name, as a JSON string.
+    """
+    fields = line.rstrip("\n").split("\t")
+    if len(fields) != 2:
+        return json.dumps({"query": line.rstrip("\n"),
+                           "error": "expected source<TAB>target"})
+
+    source, target = (resolve(field) for field in fields)
+    result = {"source": source, "target": target}
+    if source is None or target is None:
+        result["error"] = "person not found"
+        return json.dumps(result)
+
+    if cache is not None:
+        path = cache.shortest_path(source, target)
+    else:
+        path = degrees.graph.shortest_path(source, target)
+    result["degrees"] = None if path is None else len(path)
+    result["path"] = path
+    return json.dumps(result)
+
+
+def resolve(field):
+    """
+    Returns the IMDB person id for an id or a name, or None if there is
+    no such person or the name is ambiguous.
+    """
+    field = field.strip()
+    if field.isdigit() and degrees.graph.person_index(field) is not None:
+        return field
+    person_ids = degrees.graph.person_ids_for_name(field)
+    if len(person_ids) == 1:
+        return person_ids[0]
+    return None
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import random
+import sys
+import time
+
+import degrees
+from util import (Node, QueueFrontier, StackFrontier,
+                  DequeQueueFrontier, DequeStackFrontier)
+
+# (name, class, whether its operations take time linear in its size)
+FRONTIERS = [
+    ("QueueFrontier", QueueFrontier, True),
+    ("DequeQueueFrontier", DequeQueueFrontier, False),
+    ("StackFrontier", StackFrontier, True),
+    ("DequeStackFrontier", DequeStackFrontier, False),
+]
+
+# States added, checked and removed when timing frontier operations
+SAMPLE_STATES = 10000
+
+# The list frontiers take quadratic time over a sample, so they are timed
+# on this many states and the time scaled up to SAMPLE_STATES
+LINEAR_SAMPLE_STATES = 2000
+
+
+def main():
+    if len(sys.argv) > 3:
+        sys.exit("Usage: python benchmark.py [directory] [queries]")
+    directory = sys.argv[1] if len(sys.argv) > 1 else "large"
+    queries = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    print("Loading data...")
+    degrees.load_data(directory)
+    print("Data loaded.")
+
+    # same random pairs for every frontier
+    random.seed(0)
+    person_ids = list(degrees.people)
+    pairs = [tuple(random.sample(person_ids, 2)) for _ in range(queries)]
+
+    states = random.sample(person_ids, min(SAMPLE_STATES, len(person_ids)))
+    print(f"Frontier operations ({len(states)} states)")
+    for name, frontier_class, linear in FRONTIERS:
+        if linear and len(states) > LINEAR_SAMPLE_STATES:
+            sample = states[:LINEAR_SAMPLE_STATES]
+            elapsed = time_operations(frontier_class, sample)
+            elapsed *= (len(states) / len(sample)) ** 2
+            print(f"    {name:<20} {elapsed:.3f}s "
+                  f"(scaled from {len(sample)} states)")
+        else:
+            elapsed = time_operations(frontier_class, states)
+            print(f"    {name:<20} {elapsed:.3f}s")
+
+    print(f"Search over {queries} random pairs")
+    for name, frontier_class, _ in FRONTIERS:
+        start = time.perf_counter()
+        expanded = 0
+        for source, target in pairs:
+            expanded += search(frontier_class, source, target)
+        elapsed = time.perf_counter() - start
+        print(f"    {name:<20} {elapsed:.3f}s, {expanded} nodes expanded")
+
+
+def time_operations(frontier_class, states):
+    """
+    Times adding every state, checking membership of each and
+    removing them all again.
+    """
+    start = time.perf_counter()
+    frontier = frontier_class()
+    for state in states:
+        frontier.add(Node(state, None, None))
+    for state in states:
+        frontier.contains_state(state)
+    while not frontier.empty():
+        frontier.remove()
+    return time.perf_counter() - start
+
+
+def search(frontier_class, source, target):
+    """
+    Runs the same search as degrees.shortest_path with the given frontier
+    and returns the number of nodes expanded.
+    """
+    frontier = frontier_class()
+    frontier.add(Node(source, None, None))
+    explored = {source}
+    expanded = 0
+
+    while not frontier.empty():
+        node = frontier.remove()
+        expanded += 1
+        for movie_id, person_id in degrees.neighbors_for_person(node.state):
+            if person_id == target:
+                return expanded
+            if person_id not in explored and not frontier.contains_state(person_id):
+                explored.add(person_id)
+                frontier.add(Node(person_id, node, movie_id))
+
+    return expanded
+
+
+if __name__ == "__main__":
+    main()
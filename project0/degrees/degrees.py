@@ -1,7 +1,13 @@
 import csv
+import gc
 import sys
+import time
+from operator import itemgetter
 
-from util import Node, QueueFrontier
+from graph import CompactGraph, load_graph
+from landmarks import load_index
+from nameindex import NameIndex
+from util import Node, DequeQueueFrontier
 
 # Maps names to a set of corresponding person_ids
 names = {}
@@ -12,64 +18,151 @@ people = {}
 # Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
 movies = {}
 
+# NameIndex over every person, for completing and correcting names,
+# built on the first miss
+name_index = None
 
-def load_data(directory):
+# Columns read from people.csv, movies.csv and stars.csv
+PEOPLE_COLUMNS = ("id", "name", "birth")
+MOVIE_COLUMNS = ("id", "title", "year")
+STAR_COLUMNS = ("person_id", "movie_id")
+
+# CompactGraph holding the whole dataset, used instead of the dicts above when set
+graph = None
+
+# Command line flags accepted by main
+FLAGS = ["--bidirectional", "--compact", "--snapshot", "--landmarks",
+         "--timings"]
+
+
+def load_data(directory, compact=False, snapshot=False):
     """
     Load data from CSV files into memory.
+
+    If `compact`, load into an integer-indexed CompactGraph instead of
+    the names, people and movies dicts. If `snapshot`, memory-map that
+    graph from its compiled snapshot, compiling it first when missing or
+    out of date with the CSV files.
+
+    Rows are read with csv.reader and consumed as they are parsed. The
+    cyclic garbage collector is paused while the dicts are built, since
+    otherwise it rescans the millions of new dicts and sets over and over.
+
+    Returns a dict of the seconds spent in each loading phase.
     """
-    # Load people
-    with open(f"{directory}/people.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            people[row["id"]] = {
-                "name": row["name"],
-                "birth": row["birth"],
+    global graph
+    timings = {}
+    start = time.perf_counter()
+    if snapshot:
+        graph = load_graph(directory)
+        timings["snapshot"] = time.perf_counter() - start
+        return timings
+    if compact:
+        graph = CompactGraph.from_csv(directory)
+        timings["graph"] = time.perf_counter() - start
+        return timings
+
+    collecting = gc.isenabled()
+    gc.disable()
+    try:
+        # Load people
+        for person_id, name, birth in read_rows(f"{directory}/people.csv",
+                                                PEOPLE_COLUMNS):
+            people[person_id] = {
+                "name": name,
+                "birth": birth,
                 "movies": set()
             }
-            if row["name"].lower() not in names:
-                names[row["name"].lower()] = {row["id"]}
+            key = name.lower()
+            if key not in names:
+                names[key] = {person_id}
             else:
-                names[row["name"].lower()].add(row["id"])
-
-    # Load movies
-    with open(f"{directory}/movies.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            movies[row["id"]] = {
-                "title": row["title"],
-                "year": row["year"],
+                names[key].add(person_id)
+        timings["people"] = time.perf_counter() - start
+
+        # Load movies
+        start = time.perf_counter()
+        for movie_id, title, year in read_rows(f"{directory}/movies.csv",
+                                               MOVIE_COLUMNS):
+            movies[movie_id] = {
+                "title": title,
+                "year": year,
                 "stars": set()
             }
+        timings["movies"] = time.perf_counter() - start
 
-    # Load stars
-    with open(f"{directory}/stars.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
+        # Load stars
+        start = time.perf_counter()
+        for person_id, movie_id in read_rows(f"{directory}/stars.csv",
+                                             STAR_COLUMNS):
             try:
-                people[row["person_id"]]["movies"].add(row["movie_id"])
-                movies[row["movie_id"]]["stars"].add(row["person_id"])
+                people[person_id]["movies"].add(movie_id)
+                movies[movie_id]["stars"].add(person_id)
             except KeyError:
                 pass
+        timings["stars"] = time.perf_counter() - start
+    finally:
+        if collecting:
+            gc.enable()
+
+    return timings
+
+
+def read_rows(filename, columns):
+    """
+    Yields a tuple of the given columns for every row of a CSV file,
+    parsed with csv.reader rather than one dict per row.
+    """
+    with open(filename, encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        columns = itemgetter(*(header.index(column) for column in columns))
+        yield from map(columns, reader)
 
 
 def main():
-    if len(sys.argv) > 2:
-        sys.exit("Usage: python degrees.py [directory]")
-    directory = sys.argv[1] if len(sys.argv) == 2 else "large"
+    # split positional arguments from --flags
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    flags = {arg for arg in sys.argv[1:] if arg.startswith("--")}
+    if len(args) > 1 or not flags <= set(FLAGS):
+        usage = " ".join(f"[{flag}]" for flag in FLAGS)
+        sys.exit(f"Usage: python degrees.py [directory] {usage}")
+    directory = args[0] if len(args) == 1 else "large"
+
+    # select search strategy
+    if "--bidirectional" in flags:
+        search = shortest_path_bidirectional
+    else:
+        search = shortest_path
 
     # Load data from files into memory
     print("Loading data...")
-    load_data(directory)
+    timings = load_data(directory, compact="--compact" in flags,
+                        snapshot="--snapshot" in flags or "--landmarks" in flags)
     print("Data loaded.")
-
-    source = person_id_for_name(input("Name: "))
+    if "--timings" in flags:
+        for phase, seconds in timings.items():
+            print(f"    {phase}: {seconds:.3f}s")
+
+    # landmark guided search, over an index built by landmarks.py
+    if "--landmarks" in flags:
+        index = load_index(graph, directory)
+        if index is None:
+            sys.exit(f"No landmark index, run: python landmarks.py {directory}")
+        search = index.shortest_path
+
+    source = prompt_person()
     if source is None:
         sys.exit("Person not found.")
-    target = person_id_for_name(input("Name: "))
+    target = prompt_person()
     if target is None:
         sys.exit("Person not found.")
 
-    path = shortest_path(source, target)
+    path = search(source, target)
+
+    if "--landmarks" in flags:
+        lower, upper = index.separation_bounds(source, target)
+        print(f"Landmark bounds: {lower} to {upper} degrees.")
 
     if path is None:
         print("Not connected.")
@@ -78,9 +171,9 @@ def main():
         print(f"{degrees} degrees of separation.")
         path = [(None, source)] + path
         for i in range(degrees):
-            person1 = people[path[i][1]]["name"]
-            person2 = people[path[i + 1][1]]["name"]
-            movie = movies[path[i + 1][0]]["title"]
+            person1 = person_name(path[i][1])
+            person2 = person_name(path[i + 1][1])
+            movie = movie_title(path[i + 1][0])
             print(f"{i + 1}: {person1} and {person2} starred in {movie}")
 
 
@@ -91,51 +184,158 @@ def shortest_path(source, target):
 
     If no possible path, returns None.
     """
-    # initialize frontier, explored set and path list
-    frontier = QueueFrontier()
-    frontier.add(Node(source, False, False))
+    if graph is not None:
+        return graph.shortest_path(source, target)
 
-    explored = set()
-    path = []
+    if source == target:
+        return []
 
-    while True:
+    # initialize frontier, explored set and set of movies already scanned
+    frontier = DequeQueueFrontier()
+    frontier.add(Node(source, None, None))
+    explored = {source}
+    scanned = set()
+
+    while not frontier.empty():
         # select node to expand
-        try:
-            person = frontier.remove()
-        except:
-            # empty state
-            return None
+        person = frontier.remove()
+
+        # loop thru neighbors not yet explored, one cast member at a time
+        for movie_id, person_id in iter_neighbors(person.state, explored, scanned):
+            node = Node(person_id, person, movie_id)
+
+            # if person_id matches target, stop scanning and return path
+            if person_id == target:
+                path = []
+                while node.parent is not None:
+                    path.append((node.action, node.state))
+                    node = node.parent
+                path.reverse()
+                return path
 
-        # get neighbors for person
-        neighbors = neighbors_for_person(person.state)
+            # mark state as explored and add to frontier
+            explored.add(person_id)
+            frontier.add(node)
 
-        # loop thru neighbors
-        for neighbor in neighbors:
+    return None
 
-            # if previously explored, skip
-            if neighbor[1] in explored:
-                continue
 
-            # if person_id in neighbor matches target, return path
-            if neighbor[1] == target:
-                #  construct list using nodes, following parents until none
+def shortest_path_bidirectional(source, target):
+    """
+    Returns the shortest list of (movie_id, person_id) pairs
+    that connect the source to the target, searching from both
+    ends at once and meeting in the middle.
 
-                person = Node(neighbor[1], person, neighbor[0])
-                while True:
-                    path = [(person.action, person.state)] + path
+    If no possible path, returns None.
+    """
+    if source == target:
+        return []
+
+    # each side maps person_id -> (movie_id, person_id) towards its own root,
+    # plus the depth at which the person was reached
+    forward = {source: None}
+    backward = {target: None}
+    forward_depth = {source: 0}
+    backward_depth = {target: 0}
+    forward_frontier = [source]
+    backward_frontier = [target]
+    forward_scanned = set()
+    backward_scanned = set()
+
+    while forward_frontier and backward_frontier:
+
+        # always grow the smaller frontier, hubs make the other side explode
+        if len(forward_frontier) <= len(backward_frontier):
+            frontier, parents, depth = forward_frontier, forward, forward_depth
+            other_depth, scanned = backward_depth, forward_scanned
+        else:
+            frontier, parents, depth = backward_frontier, backward, backward_depth
+            other_depth, scanned = forward_depth, backward_scanned
+
+        # expand one whole level, keeping the best meeting point seen
+        next_frontier = []
+        meeting, best = None, None
+        for person_id in frontier:
+            for movie_id, neighbor_id in iter_neighbors(person_id, parents, scanned):
+                parents[neighbor_id] = (movie_id, person_id)
+                depth[neighbor_id] = depth[person_id] + 1
+                next_frontier.append(neighbor_id)
+
+                if neighbor_id in other_depth:
+                    total = depth[neighbor_id] + other_depth[neighbor_id]
+                    if best is None or total < best:
+                        meeting, best = neighbor_id, total
+
+        if meeting is not None:
+            return join_paths(forward, backward, meeting)
+
+        if frontier is forward_frontier:
+            forward_frontier = next_frontier
+        else:
+            backward_frontier = next_frontier
+
+    return None
+
+
+def join_paths(forward, backward, meeting):
+    """
+    Builds the (movie_id, person_id) path through `meeting` from
+    the parent maps of a bidirectional search.
+    """
+    # source -> meeting, following forward parents back to the source
+    path = []
+    person_id = meeting
+    while forward[person_id] is not None:
+        movie_id, parent_id = forward[person_id]
+        path.append((movie_id, person_id))
+        person_id = parent_id
+    path.reverse()
 
-                    person = person.parent
-                    if not person.parent:
-                        break
+    # meeting -> target, following backward parents towards the target
+    person_id = meeting
+    while backward[person_id] is not None:
+        movie_id, person_id = backward[person_id]
+        path.append((movie_id, person_id))
 
-                return path
+    return path
+
+
+def prompt_person():
+    """
+    Asks for a name until it matches a person, suggesting close names
+    after a miss. Returns None once there is nothing left to suggest.
+    """
+    while True:
+        name = input("Name: ")
+        person_id = person_id_for_name(name)
+        if person_id is not None:
+            return person_id
+        suggestions = suggest_names(name)
+        if not suggestions:
+            return None
+        print(f"Did you mean: {', '.join(suggestions)}?")
 
-            # else, add to frontier if the state is not already there
-            if not frontier.contains_state(neighbor[1]):
-                frontier.add(Node(neighbor[1], person, neighbor[0]))
 
-            # mark state as explored
-            explored.add(neighbor[1])
+def suggest_names(name, k=5):
+    """
+    Returns up to k names that complete or are a few edits from `name`,
+    most prolific first.
+    """
+    global name_index
+    if name_index is None and graph is not None:
+        name_index = NameIndex.from_graph(graph)
+    elif name_index is None:
+        name_index = NameIndex.from_entries(
+            (person["name"], person_id, len(person["movies"]))
+            for person_id, person in people.items()
+        )
+
+    suggestions = []
+    for person_id in name_index.prefix(name, k) + name_index.fuzzy(name, 2, k):
+        suggestion = person_name(person_id)
+        if suggestion not in suggestions and suggestion.lower() != name.lower():
+            suggestions.append(suggestion)
+    return suggestions[:k]
 
 
 def person_id_for_name(name):
@@ -143,15 +343,17 @@ def person_id_for_name(name):
     Returns the IMDB id for a person's name,
     resolving ambiguities as needed.
     """
-    person_ids = list(names.get(name.lower(), set()))
+    if graph is not None:
+        person_ids = graph.person_ids_for_name(name)
+    else:
+        person_ids = list(names.get(name.lower(), set()))
     if len(person_ids) == 0:
         return None
     elif len(person_ids) > 1:
         print(f"Which '{name}'?")
         for person_id in person_ids:
-            person = people[person_id]
-            name = person["name"]
-            birth = person["birth"]
+            name = person_name(person_id)
+            birth = person_birth(person_id)
             print(f"ID: {person_id}, Name: {name}, Birth: {birth}")
         try:
             person_id = input("Intended Person ID: ")
@@ -169,6 +371,9 @@ def neighbors_for_person(person_id):
     Returns (movie_id, person_id) pairs for people
     who starred with a given person.
     """
+    if graph is not None:
+        return graph.neighbors_for_person(person_id)
+
     movie_ids = people[person_id]["movies"]
     neighbors = set()
     for movie_id in movie_ids:
@@ -177,5 +382,51 @@ def neighbors_for_person(person_id):
     return neighbors
 
 
+def iter_neighbors(person_id, explored=(), scanned=None):
+    """
+    Yields (movie_id, person_id) pairs for people who starred with a given
+    person, straight from the movies index without building a set.
+
+    People in `explored` are skipped. If `scanned` is given, movies in it
+    are skipped and every movie is added to it as its cast is scanned,
+    since all of that cast will have been explored by then.
+    """
+    if graph is not None:
+        movie_ids = map(graph.movie_id, graph.movies(graph.person_index(person_id)))
+    else:
+        movie_ids = people[person_id]["movies"]
+
+    for movie_id in movie_ids:
+        if scanned is not None:
+            if movie_id in scanned:
+                continue
+            scanned.add(movie_id)
+        if graph is not None:
+            stars = map(graph.person_id, graph.stars(graph.movie_index(movie_id)))
+        else:
+            stars = movies[movie_id]["stars"]
+        for neighbor_id in stars:
+            if neighbor_id not in explored:
+                yield movie_id, neighbor_id
+
+
+def person_name(person_id):
+    if graph is not None:
+        return graph.name(graph.person_index(person_id))
+    return people[person_id]["name"]
+
+
+def person_birth(person_id):
+    if graph is not None:
+        return graph.birth(graph.person_index(person_id))
+    return people[person_id]["birth"]
+
+
+def movie_title(movie_id):
+    if graph is not None:
+        return graph.title(graph.movie_index(movie_id))
+    return movies[movie_id]["title"]
+
+
 if __name__ == "__main__":
     main()
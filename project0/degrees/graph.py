@@ -0,0 +1,502 @@
+import bisect
+import csv
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from collections import OrderedDict, deque
+
+# Source files a graph is built from
+SOURCES = ["people.csv", "movies.csv", "stars.csv"]
+
+# Name of the compiled graph inside a data directory
+SNAPSHOT = "graph.snapshot"
+
+# Snapshot layout: magic, sha256 of the sources, header length, json header
+MAGIC = b"DEGREES1"
+PREAMBLE = struct.Struct("<8s32sQ")
+
+# Columns written to a snapshot, in order
+COLUMNS = [
+    "person_keys", "person_names.data", "person_names.offsets", "person_births",
+    "movie_keys", "movie_titles.data", "movie_titles.offsets", "movie_years",
+    "person_offsets", "person_movies", "movie_offsets", "movie_stars",
+    "name_order",
+]
+
+
+class StringTable():
+    """
+    Stores many strings in one utf-8 buffer plus an offsets array,
+    instead of one Python object per string.
+    """
+    def __init__(self, data, offsets):
+        self.data = data
+        self.offsets = offsets
+
+    @classmethod
+    def from_strings(cls, strings):
+        data = bytearray()
+        offsets = array("q", [0])
+        for string in strings:
+            data += string.encode("utf-8")
+            offsets.append(len(data))
+        return cls(bytes(data), offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return str(self.data[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+
+
+class CompactGraph():
+    """
+    Actor/movie graph with dense integer indices.
+
+    People and movies are numbered 0..n-1 in order of their IMDB id.
+    Who starred in what is kept as two CSR adjacency lists: the movies of
+    person p are person_movies[person_offsets[p]:person_offsets[p + 1]],
+    and the stars of movie m are movie_stars[movie_offsets[m]:movie_offsets[m + 1]].
+    Every column is a flat array, so a loaded graph holds a handful of
+    Python objects no matter how large the dataset is.
+    """
+    def __init__(self, person_keys, person_names, person_births,
+                 movie_keys, movie_titles, movie_years,
+                 person_offsets, person_movies, movie_offsets, movie_stars,
+                 name_order):
+        self.person_keys = person_keys
+        self.person_names = person_names
+        self.person_births = person_births
+        self.movie_keys = movie_keys
+        self.movie_titles = movie_titles
+        self.movie_years = movie_years
+        self.person_offsets = person_offsets
+        self.person_movies = person_movies
+        self.movie_offsets = movie_offsets
+        self.movie_stars = movie_stars
+        self.name_order = name_order
+
+    @classmethod
+    def from_csv(cls, directory):
+        """
+        Build a graph from the people, movies and stars CSV files.
+        """
+        # load people, numbered in order of IMDB id
+        with open(f"{directory}/people.csv", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            next(reader)
+            rows = sorted((int(row[0]), row[1], row[2]) for row in reader)
+        person_keys = array("q", (row[0] for row in rows))
+        person_names = StringTable.from_strings(row[1] for row in rows)
+        person_births = array("h", (int(row[2] or 0) for row in rows))
+
+        # person indices sorted by lowercase name, for name lookups
+        name_order = array("i", sorted(
+            range(len(rows)), key=lambda i: rows[i][1].lower()
+        ))
+
+        # load movies, numbered in order of IMDB id
+        with open(f"{directory}/movies.csv", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            next(reader)
+            rows = sorted((int(row[0]), row[1], row[2]) for row in reader)
+        movie_keys = array("q", (row[0] for row in rows))
+        movie_titles = StringTable.from_strings(row[1] for row in rows)
+        movie_years = array("h", (int(row[2] or 0) for row in rows))
+        del rows
+
+        # load stars as (person, movie) index pairs, dropping unknown ids
+        person_index = {key: i for i, key in enumerate(person_keys)}
+        movie_index = {key: i for i, key in enumerate(movie_keys)}
+        with open(f"{directory}/stars.csv", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            next(reader)
+            pairs = set()
+            for row in reader:
+                try:
+                    pairs.add((person_index[int(row[0])], movie_index[int(row[1])]))
+                except KeyError:
+                    pass
+        del person_index, movie_index
+
+        person_offsets, person_movies = build_csr(len(person_keys), pairs)
+        movie_offsets, movie_stars = build_csr(
+            len(movie_keys), ((m, p) for p, m in pairs)
+        )
+        del pairs
+
+        return cls(person_keys, person_names, person_births,
+                   movie_keys, movie_titles, movie_years,
+                   person_offsets, person_movies, movie_offsets, movie_stars,
+                   name_order)
+
+    @classmethod
+    def from_snapshot(cls, path, digest=None):
+        """
+        Memory-map a graph written by `save`.
+
+        If `digest` is given and the snapshot was compiled from different
+        source files, returns None.
+        """
+        with open(path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, snapshot_digest, header_size = PREAMBLE.unpack_from(buffer)
+        if magic != MAGIC or (digest is not None and snapshot_digest != digest):
+            buffer.close()
+            return None
+        base = PREAMBLE.size + header_size
+        header = json.loads(buffer[PREAMBLE.size:base])
+
+        # every column is a typed view straight into the mapped file
+        view = memoryview(buffer)
+        columns = {}
+        for name in COLUMNS:
+            typecode, start, end = header[name]
+            columns[name] = view[base + start:base + end].cast(typecode)
+
+        graph = cls(
+            columns["person_keys"],
+            StringTable(columns["person_names.data"], columns["person_names.offsets"]),
+            columns["person_births"],
+            columns["movie_keys"],
+            StringTable(columns["movie_titles.data"], columns["movie_titles.offsets"]),
+            columns["movie_years"],
+            columns["person_offsets"], columns["person_movies"],
+            columns["movie_offsets"], columns["movie_stars"],
+            columns["name_order"],
+        )
+        graph.buffer = buffer
+        return graph
+
+    def save(self, path, digest):
+        """
+        Write the graph to `path` as a snapshot that can be memory-mapped
+        by `from_snapshot`, tagged with the digest of its source files.
+        """
+        # lay out every column on an 8 byte boundary after the header
+        columns = []
+        for name in COLUMNS:
+            obj = self
+            for attr in name.split("."):
+                obj = getattr(obj, attr)
+            view = memoryview(obj)
+            columns.append((name, view.format, view.tobytes()))
+
+        # column offsets are relative to the 8 byte aligned end of the header
+        header, position = {}, 0
+        for name, typecode, data in columns:
+            header[name] = [typecode, position, position + len(data)]
+            position += len(data) + (-len(data) % 8)
+        header_bytes = json.dumps(header).encode("utf-8")
+        header_bytes += b" " * (-(PREAMBLE.size + len(header_bytes)) % 8)
+
+        # write to a temporary file of our own, so neither readers nor other
+        # processes compiling the same directory see half a snapshot
+        descriptor, temporary = tempfile.mkstemp(
+            prefix=f"{os.path.basename(path)}.", suffix=".tmp",
+            dir=os.path.dirname(path) or "."
+        )
+        try:
+            os.fchmod(descriptor, 0o644)
+            with os.fdopen(descriptor, "wb") as f:
+                f.write(PREAMBLE.pack(MAGIC, digest, len(header_bytes)))
+                f.write(header_bytes)
+                for name, _, data in columns:
+                    f.write(data)
+                    f.write(bytes(-len(data) % 8))
+            os.replace(temporary, path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+
+    def person_index(self, person_id):
+        """
+        Returns the dense index for an IMDB person id, or None.
+        """
+        key = int(person_id)
+        i = bisect.bisect_left(self.person_keys, key)
+        if i < len(self.person_keys) and self.person_keys[i] == key:
+            return i
+        return None
+
+    def person_id(self, i):
+        return str(self.person_keys[i])
+
+    def movie_id(self, m):
+        return str(self.movie_keys[m])
+
+    def movie_index(self, movie_id):
+        """
+        Returns the dense index for an IMDB movie id, or None.
+        """
+        key = int(movie_id)
+        m = bisect.bisect_left(self.movie_keys, key)
+        if m < len(self.movie_keys) and self.movie_keys[m] == key:
+            return m
+        return None
+
+    def name(self, i):
+        return self.person_names[i]
+
+    def birth(self, i):
+        birth = self.person_births[i]
+        return str(birth) if birth else ""
+
+    def title(self, m):
+        return self.movie_titles[m]
+
+    def person_ids_for_name(self, name):
+        """
+        Returns the IMDB ids of every person with this name, ignoring case.
+        """
+        name = name.lower()
+        key = lambda i: self.person_names[i].lower()
+        start = bisect.bisect_left(self.name_order, name, key=key)
+        end = bisect.bisect_right(self.name_order, name, lo=start, key=key)
+        return [self.person_id(i) for i in self.name_order[start:end]]
+
+    def movies(self, i):
+        return self.person_movies[self.person_offsets[i]:self.person_offsets[i + 1]]
+
+    def stars(self, m):
+        return self.movie_stars[self.movie_offsets[m]:self.movie_offsets[m + 1]]
+
+    def neighbors(self, i):
+        """
+        Yields (movie, person) index pairs for people who starred with person i.
+        """
+        for m in self.movies(i):
+            for j in self.stars(m):
+                yield m, j
+
+    def neighbors_for_person(self, person_id):
+        """
+        Returns (movie_id, person_id) pairs for people
+        who starred with a given person.
+        """
+        return {(self.movie_id(m), self.person_id(j))
+                for m, j in self.neighbors(self.person_index(person_id))}
+
+    def shortest_path(self, source, target):
+        """
+        Returns the shortest list of (movie_id, person_id) pairs
+        that connect the source to the target.
+
+        If no possible path, returns None.
+        """
+        source = self.person_index(source)
+        target = self.person_index(target)
+        if source is None or target is None:
+            return None
+        if source == target:
+            return []
+
+        parent, via = self.bfs_tree(source, target)
+        if parent[target] == -1:
+            return None
+        return self.trace(parent, via, source, target)
+
+    def bfs_tree(self, source, target=None):
+        """
+        Runs a breadth-first search from person index `source`, stopping
+        early once `target` is reached if given.
+
+        Returns (parent, via) arrays holding the person and movie each
+        reached person was first reached through, or -1 if unreached.
+        """
+        parent = array("i", [-1]) * len(self.person_keys)
+        via = array("i", [-1]) * len(self.person_keys)
+        parent[source] = source
+
+        # a movie's whole cast is reached the first time it is scanned
+        scanned = bytearray(len(self.movie_keys))
+
+        frontier = deque([source])
+        while frontier:
+            i = frontier.popleft()
+            for m in self.movies(i):
+                if scanned[m]:
+                    continue
+                scanned[m] = 1
+                for j in self.stars(m):
+                    if parent[j] != -1:
+                        continue
+                    parent[j], via[j] = i, m
+                    if j == target:
+                        return parent, via
+                    frontier.append(j)
+
+        return parent, via
+
+    def trace(self, parent, via, source, target):
+        """
+        Follows parent pointers from target back to source and
+        returns the (movie_id, person_id) path between them.
+        """
+        path = []
+        j = target
+        while j != source:
+            path.append((self.movie_id(via[j]), self.person_id(j)))
+            j = parent[j]
+        path.reverse()
+        return path
+
+
+class TreeCache():
+    """
+    LRU cache of complete BFS trees over a CompactGraph, keyed by source.
+
+    Once the tree of a person is cached, the shortest path between them
+    and anyone else is read off its parent pointers instead of searching
+    again. Trees are evicted least recently used first to keep the cache
+    under `max_bytes`.
+    """
+    def __init__(self, graph, max_bytes=256 * 2 ** 20):
+        self.graph = graph
+        self.max_bytes = max_bytes
+        self.trees = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def tree_bytes(self):
+        """
+        Returns the memory held by one cached tree.
+        """
+        return 2 * array("i").itemsize * len(self.graph.person_keys)
+
+    def tree(self, source):
+        """
+        Returns the (parent, via) tree of person index `source`,
+        building and caching it on a miss.
+        """
+        if source in self.trees:
+            self.hits += 1
+            self.trees.move_to_end(source)
+            return self.trees[source]
+
+        self.misses += 1
+        tree = self.graph.bfs_tree(source)
+        if self.tree_bytes() <= self.max_bytes:
+            self.trees[source] = tree
+            while len(self.trees) * self.tree_bytes() > self.max_bytes:
+                self.trees.popitem(last=False)
+        return tree
+
+    def shortest_path(self, source, target):
+        """
+        Returns the shortest list of (movie_id, person_id) pairs
+        that connect the source to the target.
+
+        If no possible path, returns None.
+        """
+        graph = self.graph
+        source = graph.person_index(source)
+        target = graph.person_index(target)
+        if source is None or target is None:
+            return None
+        if source == target:
+            return []
+
+        # paths are undirected, so a cached tree of the target serves too
+        if target in self.trees and source not in self.trees:
+            parent, via = self.tree(target)
+            if parent[source] == -1:
+                return None
+            path = []
+            j = source
+            while j != target:
+                path.append((graph.movie_id(via[j]), graph.person_id(parent[j])))
+                j = parent[j]
+            return path
+
+        parent, via = self.tree(source)
+        if parent[target] == -1:
+            return None
+        return graph.trace(parent, via, source, target)
+
+    def stats(self):
+        """
+        Returns a dict of hit, miss and memory counters.
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "trees": len(self.trees),
+            "bytes": len(self.trees) * self.tree_bytes(),
+            "max_bytes": self.max_bytes,
+        }
+
+
+def source_digest(directory):
+    """
+    Returns the sha256 digest of the CSV files in `directory`.
+    """
+    digest = hashlib.sha256()
+    for name in SOURCES:
+        with open(os.path.join(directory, name), "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    return digest.digest()
+
+
+def compile_snapshot(directory):
+    """
+    Build the graph for `directory` from CSV and save it as a snapshot.
+    """
+    graph = CompactGraph.from_csv(directory)
+    graph.save(os.path.join(directory, SNAPSHOT), source_digest(directory))
+    return graph
+
+
+def load_graph(directory):
+    """
+    Returns the graph for `directory`, memory-mapped from its snapshot when
+    that is up to date with the CSV files, and compiling it otherwise.
+    If the snapshot cannot be saved, such as in a read-only directory, the
+    graph built in memory is returned all the same.
+    """
+    path = os.path.join(directory, SNAPSHOT)
+    digest = source_digest(directory)
+    if os.path.exists(path):
+        graph = CompactGraph.from_snapshot(path, digest)
+        if graph is not None:
+            return graph
+    graph = CompactGraph.from_csv(directory)
+    try:
+        graph.save(path, digest)
+    except OSError:
+        pass
+    return graph
+
+
+def build_csr(rows, pairs):
+    """
+    Builds (offsets, columns) arrays for `rows` rows from (row, column) pairs.
+    """
+    pairs = sorted(pairs)
+    offsets = array("q", [0]) * (rows + 1)
+    for row, _ in pairs:
+        offsets[row + 1] += 1
+    for row in range(rows):
+        offsets[row + 1] += offsets[row]
+    columns = array("i", (column for _, column in pairs))
+    return offsets, columns
+
+
+def main():
+    if len(sys.argv) > 2:
+        sys.exit("Usage: python graph.py [directory]")
+    directory = sys.argv[1] if len(sys.argv) == 2 else "large"
+
+    print("Compiling snapshot...")
+    compile_snapshot(directory)
+    print(f"Snapshot written to {os.path.join(directory, SNAPSHOT)}.")
+
+
+if __name__ == "__main__":
+    main()
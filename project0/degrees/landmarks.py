@@ -0,0 +1,227 @@
+import heapq
+import math
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from collections import deque
+
+from graph import load_graph, source_digest
+
+# Name of the landmark index inside a data directory
+LANDMARKS = "landmarks.bin"
+
+# Index layout: magic, sha256 of the sources, number of landmarks, people
+MAGIC = b"LANDMRK1"
+PREAMBLE = struct.Struct("<8s32sQQ")
+
+# Distance stored for people a landmark cannot reach
+UNREACHABLE = 255
+
+
+class LandmarkIndex():
+    """
+    Degrees of separation from a few landmark people to everyone else.
+
+    By the triangle inequality, for any landmark l the separation of u and
+    v is at least |d(l, u) - d(l, v)| and at most d(l, u) + d(l, v), so the
+    index bounds any separation without searching, and the lower bound is
+    an admissible A* heuristic (ALT).
+    Distances are one byte each, so the index costs k bytes per person.
+    """
+    def __init__(self, graph, landmarks, distances):
+        self.graph = graph
+        self.landmarks = landmarks
+        self.distances = distances
+
+    @classmethod
+    def build(cls, graph, k=16):
+        """
+        Build an index over the `k` people who starred in the most movies.
+        """
+        offsets = graph.person_offsets
+        people = range(len(graph.person_keys))
+        landmarks = array("i", heapq.nlargest(
+            k, people, key=lambda i: offsets[i + 1] - offsets[i]
+        ))
+        distances = [bfs_distances(graph, landmark) for landmark in landmarks]
+        return cls(graph, landmarks, distances)
+
+    @classmethod
+    def load(cls, graph, path, digest=None):
+        """
+        Memory-map an index written by `save`.
+
+        Returns None if the file is truncated, or if `digest` is given and
+        the index was built from different source files.
+        """
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size < PREAMBLE.size:
+                return None
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, index_digest, k, n = PREAMBLE.unpack_from(buffer)
+        if (magic != MAGIC or n != len(graph.person_keys)
+                or len(buffer) < PREAMBLE.size + 4 * k + k * n
+                or (digest is not None and index_digest != digest)):
+            buffer.close()
+            return None
+
+        view = memoryview(buffer)
+        start = PREAMBLE.size
+        landmarks = view[start:start + 4 * k].cast("i")
+        start += 4 * k
+        distances = [view[start + l * n:start + (l + 1) * n] for l in range(k)]
+        index = cls(graph, landmarks, distances)
+        index.buffer = buffer
+        return index
+
+    def save(self, path, digest):
+        """
+        Write the index to `path`, tagged with the digest of its source files.
+        """
+        # write to a temporary file of our own, so neither readers nor other
+        # processes building the same index see half of it
+        descriptor, temporary = tempfile.mkstemp(
+            prefix=f"{os.path.basename(path)}.", suffix=".tmp",
+            dir=os.path.dirname(path) or "."
+        )
+        try:
+            os.fchmod(descriptor, 0o644)
+            with os.fdopen(descriptor, "wb") as f:
+                f.write(PREAMBLE.pack(MAGIC, digest, len(self.landmarks),
+                                      len(self.graph.person_keys)))
+                f.write(array("i", self.landmarks).tobytes())
+                for row in self.distances:
+                    f.write(row)
+            os.replace(temporary, path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+
+    def bounds(self, u, v):
+        """
+        Returns (lower, upper) bounds on the separation of person indices
+        u and v. Both are math.inf if the index proves them unconnected.
+        """
+        lower, upper = 0, math.inf
+        for row in self.distances:
+            du, dv = row[u], row[v]
+            if du == UNREACHABLE or dv == UNREACHABLE:
+                if du != dv:
+                    return math.inf, math.inf
+                continue
+            lower = max(lower, abs(du - dv))
+            upper = min(upper, du + dv)
+        return lower, upper
+
+    def separation_bounds(self, source, target):
+        """
+        Returns (lower, upper) bounds on the degrees of separation
+        between two IMDB person ids.
+        """
+        return self.bounds(self.graph.person_index(source),
+                           self.graph.person_index(target))
+
+    def shortest_path(self, source, target):
+        """
+        Returns the shortest list of (movie_id, person_id) pairs
+        that connect the source to the target, using A* guided by
+        the landmark lower bound.
+
+        If no possible path, returns None.
+        """
+        graph = self.graph
+        source = graph.person_index(source)
+        target = graph.person_index(target)
+        if source is None or target is None:
+            return None
+        if source == target:
+            return []
+        if self.bounds(source, target)[0] == math.inf:
+            return None
+
+        # (f, -g, person) so that ties favour the deepest person
+        cost = {source: 0}
+        parent = {source: (source, -1)}
+        frontier = [(self.bounds(source, target)[0], 0, source)]
+        while frontier:
+            _, g, i = heapq.heappop(frontier)
+            g = -g
+            if g > cost[i]:
+                continue
+            if i == target:
+                break
+            for m, j in graph.neighbors(i):
+                if g + 1 < cost.get(j, math.inf):
+                    cost[j] = g + 1
+                    parent[j] = (i, m)
+                    f = g + 1 + self.bounds(j, target)[0]
+                    heapq.heappush(frontier, (f, -(g + 1), j))
+        else:
+            return None
+
+        path = []
+        j = target
+        while j != source:
+            i, m = parent[j]
+            path.append((graph.movie_id(m), graph.person_id(j)))
+            j = i
+        path.reverse()
+        return path
+
+
+def bfs_distances(graph, source):
+    """
+    Returns a bytearray of the separation between person index `source`
+    and every person, UNREACHABLE where there is no path.
+    """
+    distances = bytearray([UNREACHABLE]) * len(graph.person_keys)
+    distances[source] = 0
+    scanned = bytearray(len(graph.movie_keys))
+
+    frontier = deque([source])
+    while frontier:
+        i = frontier.popleft()
+        distance = min(distances[i] + 1, UNREACHABLE - 1)
+        for m in graph.movies(i):
+            if scanned[m]:
+                continue
+            scanned[m] = 1
+            for j in graph.stars(m):
+                if distances[j] == UNREACHABLE:
+                    distances[j] = distance
+                    frontier.append(j)
+    return distances
+
+
+def load_index(graph, directory):
+    """
+    Returns the landmark index for `directory`, or None if it has not been
+    built or is out of date with the CSV files.
+    """
+    path = os.path.join(directory, LANDMARKS)
+    if not os.path.exists(path):
+        return None
+    return LandmarkIndex.load(graph, path, source_digest(directory))
+
+
+def main():
+    if len(sys.argv) > 3:
+        sys.exit("Usage: python landmarks.py [directory] [k]")
+    directory = sys.argv[1] if len(sys.argv) > 1 else "large"
+    k = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+
+    print("Loading data...")
+    graph = load_graph(directory)
+    print("Data loaded.")
+
+    print(f"Building index over {k} landmarks...")
+    index = LandmarkIndex.build(graph, k)
+    index.save(os.path.join(directory, LANDMARKS), source_digest(directory))
+    print(f"Index written to {os.path.join(directory, LANDMARKS)}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,415 @@
+import bisect
+import heapq
+from array import array
+
+
+class NameIndex():
+    """
+    Sorted index of lowercase names for prefix completion and fuzzy lookup.
+
+    People are kept in order of lowercase name, so every prefix is a
+    contiguous range of them. A max segment tree over filmography sizes
+    finds the most prolific people in any range without scanning it.
+
+    For fuzzy lookup each name is split at its first space into a head and
+    a tail, and the distinct heads and tails get a deletion index each,
+    built on the first fuzzy lookup.
+    """
+    def __init__(self, keys, person_ids, sizes):
+        """
+        Build the index over people sorted by lowercase name: keys[i] is
+        the lowercase name of person_ids[i], who starred in sizes[i] movies.
+        keys and person_ids may be any sequences, such as lazy views of a
+        memory-mapped graph, so the index itself only adds the sizes and
+        the segment tree.
+        """
+        self.keys = keys
+        self.person_ids = person_ids
+        self.sizes = sizes
+        self.tokens_distance = -1
+
+        # bottom-up segment tree, each node holds the entry with the largest size
+        self.leaves = 1
+        while self.leaves < len(sizes):
+            self.leaves *= 2
+        self.tree = array("i", [-1]) * (2 * self.leaves)
+        self.tree[self.leaves:self.leaves + len(sizes)] = array(
+            "i", range(len(sizes))
+        )
+        for node in range(self.leaves - 1, 0, -1):
+            self.tree[node] = self.larger(self.tree[2 * node], self.tree[2 * node + 1])
+
+    @classmethod
+    def from_entries(cls, entries):
+        """
+        Build the index from (name, person_id, filmography size) entries.
+        """
+        entries = sorted((name.lower(), person_id, size)
+                         for name, person_id, size in entries)
+        return cls([entry[0] for entry in entries],
+                   [entry[1] for entry in entries],
+                   array("i", (entry[2] for entry in entries)))
+
+    @classmethod
+    def from_graph(cls, graph):
+        """
+        Build the index over a CompactGraph, reading names and ids from the
+        graph as they are needed instead of copying them out.
+        """
+        order = graph.name_order
+        offsets = graph.person_offsets
+        return cls(View(order, lambda i: graph.name(i).lower()),
+                   View(order, graph.person_id),
+                   array("i", (offsets[i + 1] - offsets[i] for i in order)))
+
+    def larger(self, a, b):
+        """
+        Returns whichever entry has the larger filmography, -1 for none.
+        """
+        if a == -1:
+            return b
+        if b == -1:
+            return a
+        return a if self.sizes[a] >= self.sizes[b] else b
+
+    def largest(self, lo, hi):
+        """
+        Returns the entry in [lo, hi) with the largest filmography.
+        """
+        best = -1
+        lo += self.leaves
+        hi += self.leaves
+        while lo < hi:
+            if lo & 1:
+                best = self.larger(best, self.tree[lo])
+                lo += 1
+            if hi & 1:
+                hi -= 1
+                best = self.larger(best, self.tree[hi])
+            lo //= 2
+            hi //= 2
+        return best
+
+    def top_entries(self, lo, hi, k):
+        """
+        Yields up to k entries in [lo, hi), largest filmography first.
+        """
+        frontier = []
+        if lo < hi:
+            best = self.largest(lo, hi)
+            frontier.append((-self.sizes[best], best, lo, hi))
+        while frontier and k > 0:
+            _, best, lo, hi = heapq.heappop(frontier)
+            yield best
+            k -= 1
+            for start, end in ((lo, best), (best + 1, hi)):
+                if start < end:
+                    i = self.largest(start, end)
+                    heapq.heappush(frontier, (-self.sizes[i], i, start, end))
+
+    def prefix(self, prefix, k=10):
+        """
+        Returns up to k person ids whose name starts with `prefix`,
+        ranked by filmography size.
+        """
+        prefix = prefix.lower()
+        lo = bisect.bisect_left(self.keys, prefix)
+        hi = bisect.bisect_left(self.keys, successor(prefix), lo) if prefix else len(self.keys)
+        return [self.person_ids[i] for i in self.top_entries(lo, hi, k)]
+
+    def fuzzy(self, name, max_distance=2, k=10):
+        """
+        Returns up to k person ids whose name is within `max_distance` edits
+        of `name`, closest first and then by filmography size.
+
+        Searches within 0 edits, then 1 and so on, stopping once k people
+        are found, since no one further away could outrank them.
+        """
+        name = name.lower()
+        for distance in range(max_distance + 1):
+            matches = self.within(name, distance)
+            if sum(end - lo for _, lo, end in matches) >= k:
+                break
+
+        people = []
+        for distance, lo, end in matches:
+            people.extend((distance, -self.sizes[i], i)
+                          for i in self.top_entries(lo, end, k))
+        return [self.person_ids[i] for _, _, i in heapq.nsmallest(k, people)]
+
+    def build_tokens(self, max_distance):
+        """
+        Splits every name at its first space and indexes the distinct heads
+        and tails for lookups within `max_distance` edits.
+
+        Names sharing a head are a contiguous range of entries, and within
+        it their tails are in sorted order, so tail_ids, the rank of every
+        entry's tail among the distinct tails, can be bisected to find the
+        entries of any head and tail.
+        """
+        heads = {}
+        tails = {}
+        head_names = []
+        tail_ranks = array("i")
+        singles = {}
+        key = None
+        for i in range(len(self.keys)):
+            previous, key = key, self.keys[i]
+            if key == previous:
+                tail_ranks.append(tail_ranks[-1])
+                if tail_ranks[-1] == -1:
+                    singles[head][1] = i + 1
+                else:
+                    head_names[heads[head]][1] = i + 1
+                continue
+            head, space, tail = key.partition(" ")
+            if head not in heads:
+                heads[head] = len(head_names)
+                head_names.append([i, i])
+            if not space:
+                tail_ranks.append(-1)
+                singles[head] = [i, i + 1]
+                continue
+            if head_names[heads[head]][0] == head_names[heads[head]][1]:
+                head_names[heads[head]][0] = i
+            head_names[heads[head]][1] = i + 1
+            tail_ranks.append(tails.setdefault(tail, len(tails)))
+
+        # renumber tails in sorted order
+        rank = array("i", [0]) * len(tails)
+        for r, tail in enumerate(sorted(tails)):
+            rank[tails[tail]] = r
+            tails[tail] = r
+        self.tail_ids = array("i", (rank[t] if t != -1 else -1
+                                    for t in tail_ranks))
+
+        self.heads = DeletionIndex(heads, max_distance)
+        self.tails = DeletionIndex(tails, max_distance)
+        self.head_lo = array("i", (lo for lo, _ in head_names))
+        self.head_hi = array("i", (hi for _, hi in head_names))
+        self.singles = {heads[head]: tuple(run) for head, run in singles.items()}
+        self.tokens_distance = max_distance
+
+    def within(self, name, max_distance):
+        """
+        Returns (distance, lo, hi) for every name within `max_distance`
+        edits of `name`, where [lo, hi) are the entries with that name.
+
+        A name with a space is its head, the space and its tail, so its
+        distance from `name` is the least, over every way of lining up
+        that space with a character of `name` or with nothing, of the
+        head's distance from what comes before plus the tail's from what
+        comes after. Of two parts sharing a budget of b edits one is within
+        b // 2, so each split looks up either side within that first and
+        then the other within what is left.
+        """
+        if max_distance > self.tokens_distance:
+            self.build_tokens(max_distance)
+        heads, tails = self.heads, self.tails
+        tail_ids = self.tail_ids
+        found = {}
+
+        def add(lo, hi, distance):
+            if lo not in found or distance < found[lo][0]:
+                found[lo] = (distance, lo, hi)
+
+        def pair(h, a, near_tails, cost):
+            # entries with head h and any of the (tail, distance) near_tails
+            lo, hi = self.head_lo[h], self.head_hi[h]
+            if hi - lo <= len(near_tails):
+                i = lo
+                while i < hi:
+                    end = bisect.bisect_right(tail_ids, tail_ids[i], i, hi)
+                    b = near_tails.get(tail_ids[i])
+                    if b is not None:
+                        add(i, end, a + b + cost)
+                    i = end
+                return
+            for t, b in near_tails.items():
+                i = bisect.bisect_left(tail_ids, t, lo, hi)
+                if i < hi and tail_ids[i] == t:
+                    add(i, bisect.bisect_right(tail_ids, t, i, hi), a + b + cost)
+
+        # names without a space
+        for h, a in heads.near(name, max_distance).items():
+            if h in self.singles:
+                add(*self.singles[h], a)
+
+        # the space lined up with name[p], or with nothing before name[p]
+        splits = [(name[:p], name[p + 1:], name[p] != " ")
+                  for p in range(len(name))]
+        splits += [(name[:p], name[p:], 1) for p in range(len(name) + 1)]
+        for before, after, cost in splits:
+            budget = max_distance - cost
+            if budget < 0:
+                continue
+            half = budget // 2
+            for h, a in heads.near(before, half).items():
+                near_tails = tails.near(after, budget - a)
+                if near_tails:
+                    pair(h, a, near_tails, cost)
+            near_tails = tails.near(after, half)
+            if near_tails:
+                rest = budget - min(near_tails.values())
+                for h, a in heads.near(before, rest).items():
+                    pair(h, a, near_tails, cost)
+        return [match for match in found.values() if match[0] <= max_distance]
+
+
+class DeletionIndex():
+    """
+    Deletion neighbourhood index over a set of tokens.
+
+    Two strings are within d edits only if deleting at most d characters
+    from each can make them equal, so every string reachable from a token
+    by up to max_distance deletions is hashed into a bucket, and a lookup
+    checks the tokens in the buckets of its own deletions. Buckets are
+    ranges of one array rather than a dict of lists, to keep the index
+    small for hundreds of thousands of tokens.
+    """
+    def __init__(self, ids, max_distance):
+        """
+        Build the index over `ids`, a dict from token to token id.
+        """
+        self.ids = ids
+        self.tokens = [None] * len(ids)
+        for token, i in ids.items():
+            self.tokens[i] = token
+        self.cache = {}
+
+        hashes = array("q")
+        entries = array("i")
+        for i, token in enumerate(self.tokens):
+            variants = deletions(token, max_distance)
+            hashes.extend(map(hash, variants))
+            entries.extend([i] * len(variants))
+
+        # counting sort of the entries into 2^b buckets by hash
+        self.mask = (1 << max(len(entries), 1).bit_length()) - 1
+        self.offsets = array("i", [0]) * (self.mask + 2)
+        for h in hashes:
+            self.offsets[(h & self.mask) + 1] += 1
+        for b in range(self.mask + 1):
+            self.offsets[b + 1] += self.offsets[b]
+        fill = array("i", self.offsets)
+        self.entries = array("i", entries)
+        for h, i in zip(hashes, entries):
+            b = h & self.mask
+            self.entries[fill[b]] = i
+            fill[b] += 1
+
+    def near(self, string, max_distance):
+        """
+        Returns a dict from the id of every token within `max_distance`
+        edits of `string` to its distance. Results are cached, since a
+        fuzzy lookup asks about the same pieces of a name many times.
+        """
+        if max_distance == 0:
+            i = self.ids.get(string)
+            return {} if i is None else {i: 0}
+        key = (string, max_distance)
+        if key in self.cache:
+            return self.cache[key]
+        if len(self.cache) > 4096:
+            self.cache.clear()
+
+        found = {}
+        seen = set()
+        shortest, longest = len(string) - max_distance, len(string) + max_distance
+        for variant in deletions(string, max_distance):
+            b = hash(variant) & self.mask
+            for i in self.entries[self.offsets[b]:self.offsets[b + 1]]:
+                if i in seen:
+                    continue
+                seen.add(i)
+                token = self.tokens[i]
+                if not shortest <= len(token) <= longest:
+                    continue
+                # a token made by deletions alone is as far as it is shorter
+                if token == variant:
+                    found[i] = len(string) - len(token)
+                    continue
+                d = distance(string, token, max_distance)
+                if d <= max_distance:
+                    found[i] = d
+        self.cache[key] = found
+        return found
+
+
+class View():
+    """
+    Read-only sequence of get(order[i]), computed on every access.
+    """
+    def __init__(self, order, get):
+        self.order = order
+        self.get = get
+
+    def __len__(self):
+        return len(self.order)
+
+    def __getitem__(self, i):
+        return self.get(self.order[i])
+
+
+def deletions(string, max_distance):
+    """
+    Returns the set of strings made by deleting up to `max_distance`
+    characters from `string`.
+    """
+    variants = {string}
+    level = variants
+    for _ in range(max_distance):
+        level = {s[:i] + s[i + 1:] for s in level for i in range(len(s))}
+        variants |= level
+    return variants
+
+
+def distance(a, b, limit):
+    """
+    Returns the edit distance between a and b if it is at most `limit`,
+    otherwise limit + 1.
+
+    Uses the bit-parallel algorithm of Myers and Hyyrö, which keeps a whole
+    column of the edit distance table as bit vectors over b, so each
+    character of a costs a few integer operations.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    if a == b:
+        return 0
+    if not b:
+        return len(a)
+
+    masks = {}
+    for i, c in enumerate(b):
+        masks[c] = masks.get(c, 0) | 1 << i
+    full = (1 << len(b)) - 1
+    last = 1 << (len(b) - 1)
+    up, down = full, 0
+    score = len(b)
+    for c in a:
+        match = masks.get(c, 0)
+        vertical = match | down
+        horizontal = (((match & up) + up) ^ up) | match
+        plus = down | ~(horizontal | up) & full
+        minus = up & horizontal
+        if plus & last:
+            score += 1
+        elif minus & last:
+            score -= 1
+        plus = (plus << 1 | 1) & full
+        minus = minus << 1 & full
+        up = minus | ~(vertical | plus) & full
+        down = plus & vertical
+    return min(score, limit + 1)
+
+
+def successor(prefix):
+    """
+    Returns the smallest string greater than every string starting with
+    `prefix`.
+    """
+    last = ord(prefix[-1])
+    if last == 0x10FFFF:
+        return successor(prefix[:-1]) if len(prefix) > 1 else chr(0x10FFFF) * 2
+    return prefix[:-1] + chr(last + 1)
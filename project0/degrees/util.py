@@ -1,3 +1,6 @@
+from collections import deque
+
+
 class Node():
     def __init__(self, state, parent, action):
         self.state = state
@@ -36,3 +39,43 @@ class QueueFrontier(StackFrontier):
             node = self.frontier[0]
             self.frontier = self.frontier[1:]
             return node
+
+
+class DequeStackFrontier():
+    """
+    StackFrontier with O(1) add, remove and contains_state, backed by a
+    deque of nodes and a count of how many frontier nodes hold each state.
+    """
+    def __init__(self):
+        self.frontier = deque()
+        self.states = {}
+
+    def add(self, node):
+        self.frontier.append(node)
+        self.states[node.state] = self.states.get(node.state, 0) + 1
+
+    def contains_state(self, state):
+        return state in self.states
+
+    def empty(self):
+        return len(self.frontier) == 0
+
+    def pop(self):
+        return self.frontier.pop()
+
+    def remove(self):
+        if self.empty():
+            raise Exception("empty frontier")
+        node = self.pop()
+        count = self.states[node.state] - 1
+        if count:
+            self.states[node.state] = count
+        else:
+            del self.states[node.state]
+        return node
+
+
+class DequeQueueFrontier(DequeStackFrontier):
+
+    def pop(self):
+        return self.frontier.popleft()
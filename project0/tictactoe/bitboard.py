@@ -0,0 +1,155 @@
+"""
+Tic Tac Toe Player on bitboards
+
+A board is a pair of 9-bit integers (x, o), one bit per cell, where
+cell (i, j) is bit 3 * i + j. Everything that would scan the board is
+precomputed for all 512 masks, so every function is a few table lookups.
+"""
+
+from tictactoe import X, O, EMPTY
+
+# Mask with every cell set
+FULL = (1 << 9) - 1
+
+# Bit of each cell (i, j)
+BITS = {(i, j): 1 << (3 * i + j) for i in range(3) for j in range(3)}
+
+# Masks of the 8 lines that win the game
+WINS = [
+    0b000000111, 0b000111000, 0b111000000,
+    0b001001001, 0b010010010, 0b100100100,
+    0b100010001, 0b001010100,
+]
+
+# Whether each mask contains a winning line
+WINNING = bytes(any(mask & win == win for win in WINS) for mask in range(FULL + 1))
+
+# Number of cells set in each mask
+COUNT = bytes(bin(mask).count("1") for mask in range(FULL + 1))
+
+# Cells (i, j) set in each mask
+CELLS = [frozenset(cell for cell, bit in BITS.items() if mask & bit)
+         for mask in range(FULL + 1)]
+
+# Minimax value of every board reached so far, keyed by (x, o)
+values = {}
+
+
+def initial_state():
+    """
+    Returns starting state of the board.
+    """
+    return (0, 0)
+
+
+def from_board(board):
+    """
+    Returns the bitboard for a list of lists board.
+    """
+    x = o = 0
+    for (i, j), bit in BITS.items():
+        if board[i][j] == X:
+            x |= bit
+        elif board[i][j] == O:
+            o |= bit
+    return (x, o)
+
+
+def to_board(board):
+    """
+    Returns the list of lists board for a bitboard.
+    """
+    x, o = board
+    return [[X if x & BITS[i, j] else O if o & BITS[i, j] else EMPTY
+             for j in range(3)]
+            for i in range(3)]
+
+
+def player(board):
+    """
+    Returns player who has the next turn on a board.
+    """
+    x, o = board
+    return X if COUNT[x] == COUNT[o] else O
+
+
+def actions(board):
+    """
+    Returns set of all possible actions (i, j) available on the board.
+    """
+    x, o = board
+    return CELLS[FULL & ~(x | o)]
+
+
+def result(board, action):
+    """
+    Returns the board that results from making move (i, j) on the board.
+    """
+    x, o = board
+    bit = BITS[action]
+    if (x | o) & bit:
+        raise Exception("Invalid move.")
+    if COUNT[x] == COUNT[o]:
+        return (x | bit, o)
+    return (x, o | bit)
+
+
+def winner(board):
+    """
+    Returns the winner of the game, if there is one.
+    """
+    x, o = board
+    if WINNING[x]:
+        return X
+    if WINNING[o]:
+        return O
+    return None
+
+
+def terminal(board):
+    """
+    Returns True if game is over, False otherwise.
+    """
+    x, o = board
+    return bool(WINNING[x] or WINNING[o]) or (x | o) == FULL
+
+
+def utility(board):
+    """
+    Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
+    """
+    x, o = board
+    if WINNING[x]:
+        return 1
+    if WINNING[o]:
+        return -1
+    return 0
+
+
+def value(board):
+    """
+    Returns the minimax value of a board, 1 if X wins with perfect play,
+    -1 if O does and 0 for a draw.
+    """
+    if board in values:
+        return values[board]
+    if terminal(board):
+        v = utility(board)
+    elif player(board) == X:
+        v = max(value(result(board, action)) for action in actions(board))
+    else:
+        v = min(value(result(board, action)) for action in actions(board))
+    values[board] = v
+    return v
+
+
+def minimax(board):
+    """
+    Returns the optimal action for the current player on the board.
+    """
+    if terminal(board):
+        return None
+    moves = sorted(actions(board))
+    if player(board) == X:
+        return max(moves, key=lambda action: value(result(board, action)))
+    return min(moves, key=lambda action: value(result(board, action)))
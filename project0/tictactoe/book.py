@@ -0,0 +1,151 @@
+"""
+Tic Tac Toe opening book
+
+Solves every legal position once per symmetry class and writes the best
+move for each one to a table with one byte per base 3 board encoding.
+"""
+
+import os
+import sys
+import tempfile
+
+import bitboard
+from tictactoe import SYMMETRIES, DIGITS, NO_MOVE, X, O
+
+# Where the book is written, next to this file
+PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "book.bin")
+
+# Entries for every base 3 encoding of a board
+SIZE = 3 ** 9
+
+# Each symmetry as a permutation of the cells 0..8
+PERMUTATIONS = [[3 * i + j for i, j in cells] for cells in SYMMETRIES]
+
+
+def encode(cells):
+    """
+    Returns the base 3 number of 9 cell digits read in order.
+    """
+    code = 0
+    for digit in cells:
+        code = code * 3 + digit
+    return code
+
+
+def digits(board):
+    """
+    Returns the digit of every cell of a bitboard, in row order.
+    """
+    x, o = board
+    return [DIGITS[X] if x >> k & 1 else DIGITS[O] if o >> k & 1 else 0
+            for k in range(9)]
+
+
+def entry(move, value):
+    """
+    Returns the book byte for best move cell `move` and value -1, 0 or 1.
+    """
+    return move * 3 + value + 1
+
+
+def reachable():
+    """
+    Yields every legal position once, as a bitboard.
+    """
+    seen = {bitboard.initial_state()}
+    stack = [bitboard.initial_state()]
+    while stack:
+        board = stack.pop()
+        yield board
+        if bitboard.terminal(board):
+            continue
+        for action in bitboard.actions(board):
+            child = bitboard.result(board, action)
+            if child not in seen:
+                seen.add(child)
+                stack.append(child)
+
+
+def build():
+    """
+    Returns the book as a bytearray, solving one position per symmetry class.
+    """
+    book = bytearray([NO_MOVE]) * SIZE
+    solved = {}
+    for board in reachable():
+        if bitboard.terminal(board):
+            continue
+        cells = digits(board)
+
+        # the canonical form reads cell permutation[k] of the board at k
+        canonical, permutation = min(
+            (encode(cells[p] for p in permutation), permutation)
+            for permutation in PERMUTATIONS
+        )
+        if canonical not in solved:
+            form = [cells[p] for p in permutation]
+            representative = (
+                sum(1 << k for k in range(9) if form[k] == DIGITS[X]),
+                sum(1 << k for k in range(9) if form[k] == DIGITS[O]),
+            )
+            i, j = bitboard.minimax(representative)
+            solved[canonical] = (3 * i + j, bitboard.value(representative))
+
+        move, value = solved[canonical]
+        book[encode(cells)] = entry(permutation[move], value)
+    return book
+
+
+def save(book):
+    """
+    Writes the book to PATH through a temporary file of its own in the same
+    directory, so readers and other writers never see a partial book.
+    """
+    descriptor, temporary = tempfile.mkstemp(
+        prefix="book.", suffix=".tmp", dir=os.path.dirname(PATH)
+    )
+    try:
+        os.fchmod(descriptor, 0o644)
+        with os.fdopen(descriptor, "wb") as f:
+            f.write(book)
+        os.replace(temporary, PATH)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+
+def load():
+    """
+    Returns the book, building and saving it first if it does not exist.
+    If it cannot be saved, such as in a read-only install, the book built
+    in memory is returned all the same.
+    """
+    try:
+        with open(PATH, "rb") as f:
+            book = f.read()
+        if len(book) == SIZE:
+            return book
+    except OSError:
+        pass
+
+    book = build()
+    try:
+        save(book)
+    except OSError:
+        pass
+    return bytes(book)
+
+
+def main():
+    if len(sys.argv) != 1:
+        sys.exit("Usage: python book.py")
+    book = build()
+    try:
+        save(book)
+    except OSError as e:
+        sys.exit(f"Could not write {PATH}: {e}")
+    print(f"Book of {SIZE - book.count(NO_MOVE)} positions written to {PATH}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,439 @@
+"""
+m,n,k-game Player
+
+Tic Tac Toe generalised to an m by n board where k in a row wins, with the
+same initial_state/player/actions/result/winner/terminal/utility/minimax
+functions as tictactoe.py, as methods of an MNKGame. Boards are the same
+lists of lists, so anything that draws a tictactoe board can draw these.
+
+Full-tree minimax is hopeless past 3x3, so minimax here runs an iterative
+deepening alpha-beta search within a time budget and returns the best move
+of the deepest search it finished.
+"""
+
+import math
+import random
+import time
+
+from tictactoe import X, O, EMPTY
+
+# Score of a win, less the number of moves it takes
+WIN = 10 ** 9
+
+# Nodes searched between checks of the clock
+CHECK_EVERY = 1024
+
+# Depth stored for positions whose whole game tree was searched
+EXACT_DEPTH = 1000
+
+# Transposition table entries kept between moves before it is cleared
+TABLE_LIMIT = 1000000
+
+# Boards with at most this many cells consider every empty cell as a move,
+# larger ones only cells next to a stone
+SMALL_BOARD = 16
+
+
+class TimeUp(Exception):
+    pass
+
+
+class MNKGame():
+
+    def __init__(self, m=3, n=3, k=3, time_budget=1.0):
+        """
+        Create a game on an m row by n column board, won by k in a row.
+        minimax returns within about `time_budget` seconds.
+        """
+        self.m = m
+        self.n = n
+        self.k = k
+        self.time_budget = time_budget
+
+        # every line of k cells, as flat cell indices, and the lines through each cell
+        self.lines = []
+        for i in range(m):
+            for j in range(n):
+                for di, dj in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                    end_i, end_j = i + (k - 1) * di, j + (k - 1) * dj
+                    if 0 <= end_i < m and 0 <= end_j < n:
+                        self.lines.append(
+                            [(i + s * di) * n + (j + s * dj) for s in range(k)]
+                        )
+        self.cell_lines = [[] for _ in range(m * n)]
+        for line, cells in enumerate(self.lines):
+            for cell in cells:
+                self.cell_lines[cell].append(line)
+
+        # cells adjacent to each cell, for generating moves near stones
+        self.adjacent = [
+            [(i + di) * n + (j + dj)
+             for di in (-1, 0, 1) for dj in (-1, 0, 1)
+             if (di or dj) and 0 <= i + di < m and 0 <= j + dj < n]
+            for i in range(m) for j in range(n)
+        ]
+
+        # score of a line holding c stones of one player and none of the other
+        self.weights = [0] + [10 ** c for c in range(k - 1)] + [WIN]
+
+        # how central each cell is, to break ties between moves
+        self.centrality = [
+            -abs(i - (m - 1) / 2) - abs(j - (n - 1) / 2)
+            for i in range(m) for j in range(n)
+        ]
+
+        # random keys for hashing positions: cell * 2 + (0 for X, 1 for O)
+        generator = random.Random(m * 10007 + n * 101 + k)
+        self.zobrist = [generator.getrandbits(64) for _ in range(2 * m * n)]
+
+        self.table = {}
+
+    def __getstate__(self):
+        # worker processes start with an empty transposition table
+        state = self.__dict__.copy()
+        state["table"] = {}
+        return state
+
+    def initial_state(self):
+        """
+        Returns starting state of the board.
+        """
+        return [[EMPTY] * self.n for _ in range(self.m)]
+
+    def player(self, board):
+        """
+        Returns player who has the next turn on a board.
+        """
+        cells = [cell for row in board for cell in row]
+        return X if cells.count(X) == cells.count(O) else O
+
+    def actions(self, board):
+        """
+        Returns set of all possible actions (i, j) available on the board.
+        """
+        return {(i, j) for i, row in enumerate(board)
+                for j, cell in enumerate(row) if cell == EMPTY}
+
+    def result(self, board, action):
+        """
+        Returns the board that results from making move (i, j) on the board.
+        """
+        i, j = action
+        if board[i][j] != EMPTY:
+            raise Exception("Invalid move.")
+        board_copy = [row[:] for row in board]
+        board_copy[i][j] = self.player(board)
+        return board_copy
+
+    def winner(self, board):
+        """
+        Returns the winner of the game, if there is one.
+        """
+        cells = [cell for row in board for cell in row]
+        for line in self.lines:
+            first = cells[line[0]]
+            if first != EMPTY and all(cells[cell] == first for cell in line):
+                return first
+        return None
+
+    def terminal(self, board):
+        """
+        Returns True if game is over, False otherwise.
+        """
+        if self.winner(board) is not None:
+            return True
+        return all(cell != EMPTY for row in board for cell in row)
+
+    def utility(self, board):
+        """
+        Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
+        """
+        winner = self.winner(board)
+        if winner == X:
+            return 1
+        elif winner == O:
+            return -1
+        return 0
+
+    def minimax(self, board, time_budget=None, max_depth=None, workers=None):
+        """
+        Returns the best action found for the current player on the board
+        within `time_budget` seconds (the game's budget by default).
+        If `workers` is given, the root actions are searched in that many
+        processes.
+        """
+        if self.terminal(board):
+            return None
+        budget = self.time_budget if time_budget is None else time_budget
+        deadline = time.perf_counter() + budget
+        if len(self.table) > TABLE_LIMIT:
+            self.table.clear()
+        if workers is not None:
+            return self.parallel_minimax(board, deadline, max_depth, workers)
+        search = Search(self, board, deadline)
+        return search.run(max_depth)
+
+    def parallel_minimax(self, board, deadline, max_depth, workers):
+        """
+        Returns the best action of the deepest root-split search finished
+        before `deadline`. The first ply is searched whatever the time.
+        """
+        import parallel
+        empty = sum(row.count(EMPTY) for row in board)
+        if max_depth is None:
+            max_depth = empty
+        best_action = None
+        with parallel.RootSplit(self, workers) as split:
+            for depth in range(1, max_depth + 1):
+                try:
+                    best_action, best, cutoff = split.search(
+                        board, depth, deadline if depth > 1 else math.inf
+                    )
+                except TimeUp:
+                    break
+                if not cutoff or abs(best) >= WIN - self.m * self.n:
+                    break
+        return best_action
+
+    def candidates(self, board):
+        """
+        Returns the actions worth searching on a nonterminal board, in order:
+        every empty cell on small boards, otherwise those next to a stone,
+        most central first and then in board order.
+        """
+        search = Search(self, board, math.inf)
+        return [divmod(cell, self.n) for cell in search.moves()]
+
+    def evaluate(self, board, alpha=-math.inf, beta=math.inf, depth=None,
+                 deadline=math.inf):
+        """
+        Returns (value, cutoff) of a board: its value for X searched `depth`
+        plies deep (to the end of the game by default), exact if it lies
+        within (alpha, beta), and whether the depth limit cut the search
+        short. Raises TimeUp past `deadline`.
+        """
+        winner = self.winner(board)
+        if winner is not None:
+            return (WIN if winner == X else -WIN), False
+        search = Search(self, board, deadline)
+        if search.empty == 0:
+            return 0, False
+        if depth is None:
+            depth = search.empty
+        search.timed = deadline != math.inf
+        search.cutoff = False
+        if search.turn == 1:
+            value = search.negamax(depth, alpha, beta, 1)
+        else:
+            value = -search.negamax(depth, -beta, -alpha, 1)
+        return value, search.cutoff
+
+
+class Search():
+    """
+    State of one iterative deepening search: a flat board of 1 for X,
+    -1 for O and 0 for empty that moves are made on and unmade from,
+    with stone counts per line, a running evaluation and a position hash
+    all kept up to date incrementally.
+    """
+    def __init__(self, game, board, deadline):
+        self.game = game
+        self.deadline = deadline
+        self.nodes = 0
+        self.history = {}
+
+        self.cells = [1 if cell == X else -1 if cell == O else 0
+                      for row in board for cell in row]
+        self.empty = self.cells.count(0)
+        self.turn = 1 if game.player(board) == X else -1
+        self.x_count = [0] * len(game.lines)
+        self.o_count = [0] * len(game.lines)
+        self.score = 0
+        self.hash = 0
+        turn = self.turn
+        for cell, stone in enumerate(self.cells):
+            if stone:
+                self.turn = stone
+                self.make(cell)
+                self.empty += 1
+        self.turn = turn
+
+    def line_score(self, line):
+        """
+        Returns the evaluation of one line, positive when it favours X.
+        """
+        x, o = self.x_count[line], self.o_count[line]
+        if x and o:
+            return 0
+        if x:
+            return self.game.weights[x]
+        return -self.game.weights[o]
+
+    def make(self, cell):
+        """
+        Places the stone of the player to move on `cell` and passes the
+        turn. Returns True if that stone completed a line of k.
+        """
+        game = self.game
+        stone = self.turn
+        counts = self.x_count if stone == 1 else self.o_count
+        won = False
+        for line in game.cell_lines[cell]:
+            self.score -= self.line_score(line)
+            counts[line] += 1
+            self.score += self.line_score(line)
+            if counts[line] == game.k:
+                won = True
+        self.cells[cell] = stone
+        self.hash ^= game.zobrist[2 * cell + (stone == -1)]
+        self.empty -= 1
+        self.turn = -stone
+        return won
+
+    def unmake(self, cell):
+        """
+        Takes back the stone on `cell` and gives the turn back.
+        """
+        game = self.game
+        stone = self.cells[cell]
+        counts = self.x_count if stone == 1 else self.o_count
+        for line in game.cell_lines[cell]:
+            self.score -= self.line_score(line)
+            counts[line] -= 1
+            self.score += self.line_score(line)
+        self.cells[cell] = 0
+        self.hash ^= game.zobrist[2 * cell + (stone == -1)]
+        self.empty += 1
+        self.turn = stone
+
+    def moves(self, first=None):
+        """
+        Returns the cells worth trying, best candidates first: the
+        remembered best move, then by history of cutoffs and centrality.
+        """
+        game = self.game
+        cells = self.cells
+        if len(cells) <= SMALL_BOARD or self.empty == len(cells):
+            moves = [cell for cell, stone in enumerate(cells) if stone == 0]
+        else:
+            moves = {neighbor for cell, stone in enumerate(cells) if stone
+                     for neighbor in game.adjacent[cell] if cells[neighbor] == 0}
+            if not moves:
+                moves = [cell for cell, stone in enumerate(cells) if stone == 0]
+        moves = sorted(moves, key=lambda cell: (
+            cell != first, -self.history.get(cell, 0), self.rank(cell)
+        ))
+        return moves
+
+    def rank(self, cell):
+        """
+        Returns the sort key of a cell with no history: most central first,
+        then in board order.
+        """
+        return -self.game.centrality[cell], cell
+
+    def negamax(self, depth, alpha, beta, ply):
+        """
+        Returns the value of the position for the player to move.
+        """
+        self.nodes += 1
+        if (self.timed and self.nodes % CHECK_EVERY == 0
+                and time.perf_counter() > self.deadline):
+            raise TimeUp
+        if depth == 0:
+            self.cutoff = True
+            return self.turn * self.score
+
+        # transposition table: hash -> (depth, value, flag, best move), where
+        # depth is EXACT_DEPTH if nothing below was cut off by the depth limit
+        original_alpha = alpha
+        entry = self.game.table.get(self.hash)
+        first = None
+        if entry is not None:
+            entry_depth, value, flag, first = entry
+            if entry_depth >= depth and (
+                    flag == 0
+                    or (flag == 1 and value >= beta)
+                    or (flag == -1 and value <= alpha)):
+                if entry_depth != EXACT_DEPTH:
+                    self.cutoff = True
+                return value
+
+        cutoff, self.cutoff = self.cutoff, False
+        best, best_move = -math.inf, None
+        for cell in self.moves(first):
+            if self.make(cell):
+                value = WIN - ply
+            elif self.empty == 0:
+                value = 0
+            else:
+                value = -self.negamax(depth - 1, -beta, -alpha, ply + 1)
+            self.unmake(cell)
+
+            if value > best:
+                best, best_move = value, cell
+            if best > alpha:
+                alpha = best
+            if alpha >= beta:
+                self.history[cell] = self.history.get(cell, 0) + depth * depth
+                break
+
+        if best <= original_alpha:
+            flag = -1
+        elif best >= beta:
+            flag = 1
+        else:
+            flag = 0
+        stored_depth = depth if self.cutoff else EXACT_DEPTH
+        self.game.table[self.hash] = (stored_depth, best, flag, best_move)
+        self.cutoff = self.cutoff or cutoff
+        return best
+
+    def run(self, max_depth=None):
+        """
+        Searches one ply deeper at a time until the budget runs out, the
+        whole game tree has been searched or a forced result is found.
+        Returns the best (i, j) of the deepest finished search.
+        """
+        n = self.game.n
+        if max_depth is None:
+            max_depth = self.empty
+        best_move = None
+        for depth in range(1, max_depth + 1):
+            self.cutoff = False
+            try:
+                best_move, best = self.root(depth, best_move)
+            except TimeUp:
+                break
+            if not self.cutoff or abs(best) >= WIN - len(self.cells):
+                break
+        return divmod(best_move, n)
+
+    def root(self, depth, first):
+        """
+        Returns (best cell, value) of a search `depth` plies deep. The clock
+        is not checked on the first ply, so there is a move however short
+        the budget. A search that runs out of time is abandoned mid-move.
+
+        Moves are tried best candidate first, but ties between equally good
+        moves go to the lowest rank, so the move does not depend on the
+        order they were tried in: a root split picks the same one.
+        """
+        self.timed = depth > 1
+        alpha, beta = -math.inf, math.inf
+        best, best_move = -math.inf, None
+        for cell in self.moves(first):
+            if self.make(cell):
+                value = WIN
+            elif self.empty == 0:
+                value = 0
+            else:
+                value = -self.negamax(depth - 1, -beta, -alpha, 1)
+            self.unmake(cell)
+            if value > best or (value == best
+                                and self.rank(cell) < self.rank(best_move)):
+                best, best_move = value, cell
+            # values are integers, so a window one below the best keeps
+            # the value of every move that ties it exact
+            alpha = max(alpha, best - 1)
+        return best_move, best
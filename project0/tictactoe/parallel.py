@@ -0,0 +1,170 @@
+"""
+Root-split parallel minimax
+
+Each action at the root of the search is searched in its own worker
+process. The workers share the best root value found so far: a child is
+searched only as far as needed to tell whether it can match that value,
+so later children are cut off as soon as an earlier one settles. Values
+are integers, so a window one below the best keeps every child that could
+tie it exact, and the move picked is the first best one in root order.
+For an mnk.MNKGame that order is MNKGame.candidates, and a serial search
+breaks ties by the same order, so both pick the same move.
+
+Works for tictactoe.py itself and for any mnk.MNKGame. Run this module to
+check the root split against serial search on random positions.
+"""
+
+import math
+import multiprocessing
+import random
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import tictactoe as ttt
+
+# Game searched in this process, None for tictactoe.py itself
+game = None
+
+# Best root value found so far for the player to move, shared by all workers
+bound = None
+
+
+def init_worker(worker_game, shared_bound):
+    """
+    Sets up a worker process to search `worker_game`.
+    """
+    global game, bound
+    game, bound = worker_game, shared_bound
+
+
+def evaluate(board, maximizing, depth=None, deadline=math.inf):
+    """
+    Returns (value, cutoff) of a root child: its value for X, exact if it
+    could match the best root value so far and otherwise only shown to be
+    worse, and whether the depth limit cut the search short.
+    """
+    with bound.get_lock():
+        best = bound.value
+    if maximizing:
+        alpha, beta = best - 1, math.inf
+    else:
+        alpha, beta = -math.inf, best + 1
+
+    if game is None:
+        value, cutoff = ttt.value(board, alpha, beta), False
+    else:
+        value, cutoff = game.evaluate(board, alpha, beta, depth, deadline)
+
+    with bound.get_lock():
+        if value > bound.value if maximizing else value < bound.value:
+            bound.value = value
+    return value, cutoff
+
+
+class RootSplit():
+    """
+    Pool of worker processes that search the root actions of a game.
+    With one worker the children are searched in this process instead.
+    """
+    def __init__(self, game=None, workers=None):
+        self.game = game
+        self.bound = multiprocessing.Value("d", 0)
+        if workers == 1:
+            self.executor = None
+            init_worker(game, self.bound)
+        else:
+            self.executor = ProcessPoolExecutor(
+                workers, initializer=init_worker, initargs=(game, self.bound)
+            )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+
+    def search(self, board, depth=None, deadline=math.inf):
+        """
+        Returns (action, value, cutoff) for the player to move on a
+        nonterminal board, searched `depth` plies deep (to the end of the
+        game by default). Raises mnk.TimeUp if a worker passes `deadline`.
+        """
+        if self.game is None:
+            source = ttt
+            moves = sorted(ttt.actions(board))
+        else:
+            source = self.game
+            moves = self.game.candidates(board)
+        maximizing = source.player(board) == ttt.X
+        boards = [source.result(board, action) for action in moves]
+        child_depth = None if depth is None else depth - 1
+
+        self.bound.value = -math.inf if maximizing else math.inf
+        if self.executor is None:
+            results = [evaluate(child, maximizing, child_depth, deadline)
+                       for child in boards]
+        else:
+            results = list(self.executor.map(
+                evaluate, boards, repeat(maximizing),
+                repeat(child_depth), repeat(deadline)
+            ))
+
+        values = [value for value, _ in results]
+        best = max(values) if maximizing else min(values)
+        cutoff = any(cutoff for _, cutoff in results)
+        return moves[values.index(best)], best, cutoff
+
+
+def minimax(board, game=None, workers=None):
+    """
+    Returns the optimal action for the current player on the board,
+    searching the root actions in `workers` processes (one per CPU by
+    default).
+    """
+    source = ttt if game is None else game
+    if source.terminal(board):
+        return None
+    with RootSplit(game, workers) as split:
+        return split.search(board)[0]
+
+
+def check(positions=20, seed=0):
+    """
+    Returns the number of random 4x4 and 7x7 positions out of `positions`
+    of each where the root split and a serial search pick different moves.
+    """
+    from mnk import MNKGame
+
+    generator = random.Random(seed)
+    differ = 0
+    for m, n, k, depth in [(4, 4, 3, None), (7, 7, 4, 3)]:
+        for _ in range(positions):
+            game = MNKGame(m, n, k)
+            board = game.initial_state()
+            for _ in range(generator.randrange(2, 7)):
+                if game.terminal(board):
+                    break
+                board = game.result(
+                    board, generator.choice(sorted(game.actions(board)))
+                )
+            if game.terminal(board):
+                continue
+            serial = MNKGame(m, n, k).minimax(board, math.inf, depth)
+            split = MNKGame(m, n, k).minimax(board, math.inf, depth, workers=2)
+            if serial != split:
+                differ += 1
+                print(f"{m}x{n}: serial {serial}, root split {split}")
+    return differ
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2:
+        sys.exit("Usage: python parallel.py [positions]")
+    if check(int(sys.argv[1]) if len(sys.argv) > 1 else 20):
+        sys.exit(1)
+    print("Root split matches serial search")
@@ -1,11 +1,33 @@
 import pygame
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 import tictactoe as ttt
+from mnk import MNKGame
+
+args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+options = dict(arg[2:].split("=", 1) for arg in sys.argv[1:]
+               if arg.startswith("--") and "=" in arg)
+if len(args) not in (0, 3) or not set(options) <= {"budget"}:
+    sys.exit("Usage: python runner.py [m n k] [--budget=SECONDS]")
+m, n, k = (int(arg) for arg in args) if args else (3, 3, 3)
+budget = float(options.get("budget", 1.0))
+
+# Plain tic-tac-toe plays perfectly from the opening book, anything
+# larger searches for up to `budget` seconds a move
+if (m, n, k) == (3, 3, 3):
+    game = ttt
+else:
+    game = MNKGame(m, n, k, budget)
+
+# The computer thinks in a background thread, so the window keeps drawing
+thinker = ThreadPoolExecutor(max_workers=1)
+thinking = None
 
 pygame.init()
 size = width, height = 600, 400
+clock = pygame.time.Clock()
 
 # Colors
 black = (0, 0, 0)
@@ -15,11 +37,13 @@ screen = pygame.display.set_mode(size)
 
 mediumFont = pygame.font.Font("OpenSans-Regular.ttf", 28)
 largeFont = pygame.font.Font("OpenSans-Regular.ttf", 40)
-moveFont = pygame.font.Font("OpenSans-Regular.ttf", 60)
+
+# Tiles fit between the title and the button below the board
+tile_size = min(80, (height - 140) // m, (width - 40) // n)
+moveFont = pygame.font.Font("OpenSans-Regular.ttf", tile_size * 3 // 4)
 
 user = None
-board = ttt.initial_state()
-ai_turn = False
+board = game.initial_state()
 
 while True:
 
@@ -67,13 +91,12 @@ while True:
     else:
 
         # Draw game board
-        tile_size = 80
-        tile_origin = (width / 2 - (1.5 * tile_size),
-                       height / 2 - (1.5 * tile_size))
+        tile_origin = (width / 2 - (n / 2 * tile_size),
+                       height / 2 - (m / 2 * tile_size))
         tiles = []
-        for i in range(3):
+        for i in range(m):
             row = []
-            for j in range(3):
+            for j in range(n):
                 rect = pygame.Rect(
                     tile_origin[0] + j * tile_size,
                     tile_origin[1] + i * tile_size,
@@ -89,12 +112,12 @@ while True:
                 row.append(rect)
             tiles.append(row)
 
-        game_over = ttt.terminal(board)
-        player = ttt.player(board)
+        game_over = game.terminal(board)
+        player = game.player(board)
 
         # Show title
         if game_over:
-            winner = ttt.winner(board)
+            winner = game.winner(board)
             if winner is None:
                 title = f"Game Over: Tie."
             else:
@@ -108,24 +131,22 @@ while True:
         titleRect.center = ((width / 2), 30)
         screen.blit(title, titleRect)
 
-        # Check for AI move
+        # Start the AI thinking, and play its move once it has one
         if user != player and not game_over:
-            if ai_turn:
-                time.sleep(0.5)
-                move = ttt.minimax(board)
-                board = ttt.result(board, move)
-                ai_turn = False
-            else:
-                ai_turn = True
+            if thinking is None:
+                thinking = thinker.submit(game.minimax, board)
+            elif thinking.done():
+                board = game.result(board, thinking.result())
+                thinking = None
 
         # Check for a user move
         click, _, _ = pygame.mouse.get_pressed()
         if click == 1 and user == player and not game_over:
             mouse = pygame.mouse.get_pos()
-            for i in range(3):
-                for j in range(3):
+            for i in range(m):
+                for j in range(n):
                     if (board[i][j] == ttt.EMPTY and tiles[i][j].collidepoint(mouse)):
-                        board = ttt.result(board, (i, j))
+                        board = game.result(board, (i, j))
 
         if game_over:
             againButton = pygame.Rect(width / 3, height - 65, width / 3, 50)
@@ -140,7 +161,7 @@ while True:
                 if againButton.collidepoint(mouse):
                     time.sleep(0.2)
                     user = None
-                    board = ttt.initial_state()
-                    ai_turn = False
+                    board = game.initial_state()
 
     pygame.display.flip()
+    clock.tick(60)
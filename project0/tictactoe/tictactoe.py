@@ -3,14 +3,45 @@ Tic Tac Toe Player
 """
 
 import math
-
-from copy import deepcopy
+import time
 
 
 X = "X"
 O = "O"
 EMPTY = None
 
+# Cell (i, j) of every symmetry of the board, read row by row
+SYMMETRIES = []
+for transpose in (False, True):
+    for flip_rows in (False, True):
+        for flip_cols in (False, True):
+            cells = []
+            for i in range(3):
+                for j in range(3):
+                    r, c = (j, i) if transpose else (i, j)
+                    cells.append((2 - r if flip_rows else r,
+                                  2 - c if flip_cols else c))
+            SYMMETRIES.append(cells)
+
+# Digit of each mark in a board key
+DIGITS = {EMPTY: 0, X: 1, O: 2}
+
+# Opening book of the best move for every position, loaded by minimax
+opening_book = None
+
+# Book entry of a position with no move in the book
+NO_MOVE = 255
+
+# Transposition table: board key -> (value, flag)
+table = {}
+
+# Whether a stored value is exact, or only a lower or upper bound
+EXACT, LOWER, UPPER = 0, 1, 2
+
+# Positions searched and seconds spent searching since the last reset_stats
+nodes = 0
+seconds = 0.0
+
 
 def initial_state():
     """
@@ -55,7 +86,7 @@ def result(board, action):
     if board[row][cell] != EMPTY:
         raise Exception("Invalid move.")
 
-    board_copy = deepcopy(board)
+    board_copy = [row[:] for row in board]
 
     # determine player making move
     turn = player(board_copy)
@@ -123,56 +154,292 @@ def minimax(board):
     """
     if terminal(board):
         return None
+    return evaluate(board)[0]
+
+
+def evaluate(board):
+    """
+    Returns (optimal action, minimax value) for the board, where the action
+    is None if the game is over.
+    """
+    global opening_book
+    if terminal(board):
+        return None, utility(board)
+
+    # look the move up in the opening book, loading it on first use
+    if opening_book is None:
+        import book
+        opening_book = book.load()
+    entry = opening_book[board_code(board)]
+    if entry != NO_MOVE:
+        return divmod(entry // 3, 3), entry % 3 - 1
+
+    # positions that cannot arise in play are searched instead
+    return search(board), value(board)
 
-    if player(board) == X:
-        return max_value(deepcopy(board), board)
 
-    return min_value(deepcopy(board), board)
+def evaluate_many(boards):
+    """
+    Yields (optimal action, minimax value) for each board of an iterable,
+    in order. Each distinct board is evaluated once and every search shares
+    the transposition table, so repeated positions cost a dictionary lookup.
+    There are at most 3 ** 9 distinct boards, so memory stays bounded
+    however long the stream.
+    """
+    results = {}
+    for board in boards:
+        code = board_code(board)
+        if code not in results:
+            results[code] = evaluate(board)
+        yield results[code]
 
 
-def max_value(board, og):
+def search(board, workers=None, copy=False):
+    """
+    Returns the optimal action for the current player on the board,
+    found by alpha-beta search. If `workers` is given, the root actions
+    are searched in that many processes.
+
+    Moves are made on and taken back from one working copy of the board,
+    unless `copy` is set, which searches a new board per move with result.
+    """
+    global seconds
+    if terminal(board):
+        return None
+    if workers is not None:
+        import parallel
+        return parallel.minimax(board, workers=workers)
+    start = time.perf_counter()
+
+    # search each action with alpha-beta, keeping the first best one
+    turn = player(board)
+    work = [row[:] for row in board]
+    alpha, beta = -math.inf, math.inf
+    best_action, best = None, None
+    for action in sorted(actions(board)):
+        if copy and turn == X:
+            value = min_value(result(board, action), alpha, beta)
+        elif copy:
+            value = max_value(result(board, action), alpha, beta)
+        else:
+            value = try_move(work, action, turn, alpha, beta)
+
+        if turn == X:
+            if best is None or value > best:
+                best_action, best = action, value
+            alpha = max(alpha, value)
+        else:
+            if best is None or value < best:
+                best_action, best = action, value
+            beta = min(beta, value)
+
+        # nothing beats a win
+        if best == utility_of(turn):
+            break
+
+    seconds += time.perf_counter() - start
+    return best_action
+
+
+def value(board, alpha=-math.inf, beta=math.inf):
+    """
+    Returns the minimax value of a board, exact if it lies within
+    (alpha, beta) and otherwise only a bound on that side of the window.
+    """
+    global seconds
     if terminal(board):
         return utility(board)
+    start = time.perf_counter()
+    v = in_place_value([row[:] for row in board], player(board), alpha, beta)
+    seconds += time.perf_counter() - start
+    return v
 
-    v, goal, potential = -math.inf, 1, {}
-
-    for i, action in enumerate(actions(board)):
-        val = min_value(result(board, action), og)
-        v = max(v, val)
 
-        # perform check on moves available from current state
-        if len(actions(board)) - len(actions(og)) == 0:
-            if val == goal:
-                return action
+def try_move(board, action, turn, alpha, beta):
+    """
+    Returns the value of `turn` making move (i, j) on the board, searched
+    within (alpha, beta). The move is made on the board itself and taken
+    back before returning.
+    """
+    global nodes
+    nodes += 1
+    i, j = action
+    board[i][j] = turn
+    if completes_line(board, i, j):
+        v = utility_of(turn)
+    else:
+        v = in_place_value(board, O if turn == X else X, alpha, beta)
+    board[i][j] = EMPTY
+    return v
 
-            potential[val] = action
 
-            # all current actions evaluated, return best option
-            if i + 1 == len(actions(board)):
-                return potential[max(potential.keys())]
+def in_place_value(board, turn, alpha, beta):
+    """
+    Returns the value of a board that nobody has won with `turn` to move,
+    searching only as much as needed to tell whether it lies within
+    (alpha, beta). Every move tried is taken back, leaving the board as
+    it was.
+    """
+    moves = actions(board)
+    if not moves:
+        return 0
 
+    key = board_key(board)
+    value = lookup(key, alpha, beta)
+    if value is not None:
+        return value
+
+    if turn == X:
+        v, window = -math.inf, alpha
+        for action in moves:
+            v = max(v, try_move(board, action, X, window, beta))
+            if v >= beta:
+                break
+            window = max(window, v)
+    else:
+        v, window = math.inf, beta
+        for action in moves:
+            v = min(v, try_move(board, action, O, alpha, window))
+            if v <= alpha:
+                break
+            window = min(window, v)
+
+    store(key, v, alpha, beta)
     return v
 
 
-def min_value(board, og):
+def completes_line(board, i, j):
+    """
+    Returns True if the mark at (i, j) is part of three in a row.
+    """
+    mark = board[i][j]
+    return (board[i][0] == board[i][1] == board[i][2] == mark
+            or board[0][j] == board[1][j] == board[2][j] == mark
+            or (i == j and board[0][0] == board[1][1] == board[2][2] == mark)
+            or (i + j == 2 and board[0][2] == board[1][1] == board[2][0] == mark))
+
+
+def max_value(board, alpha, beta):
+    """
+    Returns the value of a board with X to move, searching only as much as
+    needed to tell whether it lies within (alpha, beta).
+    """
+    global nodes
+    nodes += 1
     if terminal(board):
         return utility(board)
 
-    v, goal, potential = math.inf, -1, {}
+    key = board_key(board)
+    value = lookup(key, alpha, beta)
+    if value is not None:
+        return value
+
+    v, window = -math.inf, alpha
+    for action in actions(board):
+        v = max(v, min_value(result(board, action), window, beta))
+        if v >= beta:
+            break
+        window = max(window, v)
 
-    for i, action in enumerate(actions(board)):
-        val = max_value(result(board, action), og)
-        v = min(v, val)
+    store(key, v, alpha, beta)
+    return v
 
-        # perform check on moves available from current state
-        if len(actions(board)) - len(actions(og)) == 0:
-            if val == goal:
-                return action
 
-            potential[val] = action
+def min_value(board, alpha, beta):
+    """
+    Returns the value of a board with O to move, searching only as much as
+    needed to tell whether it lies within (alpha, beta).
+    """
+    global nodes
+    nodes += 1
+    if terminal(board):
+        return utility(board)
+
+    key = board_key(board)
+    value = lookup(key, alpha, beta)
+    if value is not None:
+        return value
 
-            # all current actions evaluated, return best option
-            if i + 1 == len(actions(board)):
-                return potential[min(potential.keys())]
+    v, window = math.inf, beta
+    for action in actions(board):
+        v = min(v, max_value(result(board, action), alpha, window))
+        if v <= alpha:
+            break
+        window = min(window, v)
 
+    store(key, v, alpha, beta)
     return v
+
+
+def reset_stats():
+    """
+    Zeroes the node and time counters.
+    """
+    global nodes, seconds
+    nodes, seconds = 0, 0.0
+
+
+def nodes_per_second():
+    """
+    Returns the positions searched per second since the last reset_stats.
+    """
+    return nodes / seconds if seconds else 0.0
+
+
+def utility_of(turn):
+    """
+    Returns the utility of a win for `turn`.
+    """
+    return 1 if turn == X else -1
+
+
+def board_code(board):
+    """
+    Returns the base 3 number a board reads as, row by row.
+    """
+    code = 0
+    for row in board:
+        for cell in row:
+            code = code * 3 + DIGITS[cell]
+    return code
+
+
+def board_key(board):
+    """
+    Returns a key shared by a board and all of its rotations and reflections,
+    the smallest base 3 number any of them reads as.
+    """
+    keys = []
+    for cells in SYMMETRIES:
+        key = 0
+        for i, j in cells:
+            key = key * 3 + DIGITS[board[i][j]]
+        keys.append(key)
+    return min(keys)
+
+
+def lookup(key, alpha, beta):
+    """
+    Returns the stored value of a board if it settles a search
+    within (alpha, beta), None otherwise.
+    """
+    if key not in table:
+        return None
+    value, flag = table[key]
+    if (flag == EXACT
+            or (flag == LOWER and value >= beta)
+            or (flag == UPPER and value <= alpha)):
+        return value
+    return None
+
+
+def store(key, value, alpha, beta):
+    """
+    Stores the value a search within (alpha, beta) found for a board.
+    """
+    if value <= alpha:
+        table[key] = (value, UPPER)
+    elif value >= beta:
+        table[key] = (value, LOWER)
+    else:
+        table[key] = (value, EXACT)
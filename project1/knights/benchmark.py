@@ -0,0 +1,109 @@
+import sys
+import time
+
+import logic
+from logic import (Symbol, And, Not, Implication, Biconditional,
+                   model_check, model_check_many)
+from generator import generate
+import puzzle
+
+METHODS = [
+    ("pruned", {}),
+    ("compiled", {"compiled": True}),
+    ("sat", {"sat": True}),
+]
+
+# Largest number of characters the compiled checker, which tries every
+# model, is timed on
+COMPILED_LIMIT = 10
+
+# Random puzzles generated for each number of characters
+SEEDS = range(3)
+
+
+def main():
+    if len(sys.argv) > 3:
+        sys.exit("Usage: python benchmark.py [characters] "
+                 "[statements per character]")
+    largest = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    ratio = float(sys.argv[2]) if len(sys.argv) > 2 else 1.5
+
+    symbols = [puzzle.AKnight, puzzle.AKnave, puzzle.BKnight,
+               puzzle.BKnave, puzzle.CKnight, puzzle.CKnave]
+    print("Puzzles from puzzle.py")
+    for number, knowledge in enumerate([puzzle.knowledge0, puzzle.knowledge1,
+                                        puzzle.knowledge2, puzzle.knowledge3]):
+        report(f"Puzzle {number}", [(knowledge, symbols)], 3)
+
+    print("Chains of characters, each speaking about the next")
+    for n in range(4, largest + 1, 2):
+        report(f"{n} characters", [chain(n)], n)
+
+    print(f"Random puzzles, {ratio:g} statements per character, "
+          f"mean of {len(SEEDS)}")
+    for n in range(2, largest + 1, 2):
+        puzzles = [generate(n, round(ratio * n), seed)[:2] for seed in SEEDS]
+        report(f"{n} characters", puzzles, n)
+
+
+def report(name, puzzles, characters):
+    """
+    Prints the time and models evaluated per entailment check of each
+    method, checking every symbol of every (knowledge, symbols) puzzle.
+    """
+    checks = sum(len(symbols) for _, symbols in puzzles)
+    results = []
+    for method, options in METHODS:
+        if method == "compiled" and characters > COMPILED_LIMIT:
+            results.append(f"{method} -")
+            continue
+        logic.models_evaluated = 0
+        start = time.perf_counter()
+        for knowledge, symbols in puzzles:
+            for symbol in symbols:
+                model_check(knowledge, symbol, **options)
+        results.append(measure(method, start, checks, options))
+
+    # every symbol at once, from an empty cache of models
+    logic.satisfying.clear()
+    logic.models_evaluated = 0
+    start = time.perf_counter()
+    for knowledge, symbols in puzzles:
+        model_check_many(knowledge, symbols)
+    results.append(measure("many", start, checks, {}))
+    print(f"    {name:<16} " + ", ".join(results))
+
+
+def measure(method, start, checks, options):
+    """
+    Returns the time and models evaluated per check since `start`, with
+    models only for the methods that count them.
+    """
+    elapsed = (time.perf_counter() - start) / checks
+    if options:
+        return f"{method} {elapsed * 1000:.3f}ms"
+    models = logic.models_evaluated / checks
+    return f"{method} {elapsed * 1000:.3f}ms {models:.0f} models"
+
+
+def chain(n):
+    """
+    Returns (knowledge, symbols) of n characters, each a knight or a knave,
+    where character i says character i + 1 is a knight if i is even and
+    a knave if i is odd.
+    """
+    knights = [Symbol(f"{i} is a Knight") for i in range(n)]
+    knaves = [Symbol(f"{i} is a Knave") for i in range(n)]
+    knowledge = And()
+    for knight, knave in zip(knights, knaves):
+        knowledge.add(Biconditional(knight, Not(knave)))
+    for i in range(n):
+        j = (i + 1) % n
+        claim = knaves[j] if i % 2 else knights[j]
+        knowledge.add(Implication(knights[i], claim))
+        knowledge.add(Implication(knaves[i], Not(claim)))
+    return knowledge, knights + knaves
+
+
+if __name__ == "__main__":
+    main()
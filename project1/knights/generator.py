@@ -0,0 +1,87 @@
+import random
+import sys
+
+from logic import (Symbol, And, Or, Not, Implication, Biconditional,
+                   model_check_many)
+
+# What a character can say about one or two others, as a function of
+# their knight symbols
+CLAIMS = [
+    ("{0} is a knight.", lambda a: a),
+    ("{0} is a knave.", lambda a: Not(a)),
+    ("{0} and {1} are both knights.", lambda a, b: And(a, b)),
+    ("{0} and {1} are both knaves.", lambda a, b: And(Not(a), Not(b))),
+    ("{0} or {1} is a knight.", lambda a, b: Or(a, b)),
+    ("{0} or {1} is a knave.", lambda a, b: Or(Not(a), Not(b))),
+    ("{0} and {1} are the same kind.", lambda a, b: Biconditional(a, b)),
+    ("{0} and {1} are of different kinds.",
+     lambda a, b: Not(Biconditional(a, b))),
+    ("If {0} is a knight, so is {1}.", lambda a, b: Implication(a, b)),
+]
+
+
+def generate(characters, statements, seed=None, consistent=True):
+    """
+    Returns (knowledge, symbols, lines) of a random puzzle: a knowledge
+    base over `characters` characters who make `statements` statements,
+    the knight and knave symbol of every character, and the statements
+    in words.
+
+    If `consistent` is set, the statements are chosen to be true of a
+    hidden assignment of knights and knaves, so the puzzle has a solution.
+    """
+    generator = random.Random(seed)
+    names = [name(i) for i in range(characters)]
+    knights = [Symbol(f"{n} is a Knight") for n in names]
+    knaves = [Symbol(f"{n} is a Knave") for n in names]
+    hidden = {knight.name: generator.random() < 0.5 for knight in knights}
+
+    knowledge = And()
+    for knight, knave in zip(knights, knaves):
+        knowledge.add(Biconditional(knight, Not(knave)))
+
+    lines = []
+    while len(lines) < statements:
+        speaker = generator.randrange(characters)
+        text, claim = generator.choice(CLAIMS)
+        arity = claim.__code__.co_argcount
+        if arity > characters:
+            continue
+        about = generator.sample(range(characters), arity)
+        sentence = claim(*[knights[i] for i in about])
+        if consistent and (sentence.evaluate(hidden)
+                           != hidden[knights[speaker].name]):
+            continue
+
+        knowledge.add(Implication(knights[speaker], sentence))
+        knowledge.add(Implication(knaves[speaker], Not(sentence)))
+        words = text.format(*[names[i] for i in about])
+        lines.append(f'{names[speaker]} says "{words}"')
+    return knowledge, knights + knaves, lines
+
+
+def name(i):
+    """
+    Returns the name of character i: A to Z, then A1 to Z1 and so on.
+    """
+    letter = chr(ord("A") + i % 26)
+    return letter if i < 26 else f"{letter}{i // 26}"
+
+
+def main():
+    if len(sys.argv) not in (3, 4):
+        sys.exit("Usage: python generator.py characters statements [seed]")
+    characters, statements = int(sys.argv[1]), int(sys.argv[2])
+    seed = int(sys.argv[3]) if len(sys.argv) > 3 else None
+
+    knowledge, symbols, lines = generate(characters, statements, seed)
+    for line in lines:
+        print(line)
+    print("Solution")
+    for symbol, holds in zip(symbols, model_check_many(knowledge, symbols)):
+        if holds:
+            print(f"    {symbol}")
+
+
+if __name__ == "__main__":
+    main()
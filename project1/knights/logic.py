@@ -1,19 +1,102 @@
 import itertools
+import multiprocessing
+import weakref
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Models of recently checked knowledge bases, keyed by their parts
+satisfying = {}
+
+# Knowledge bases whose models are kept
+SATISFYING_LIMIT = 32
+
+# Knowledge base, query and symbols a worker process checks parts of
+problem = None
+
+# Set in worker processes once another worker has found a counter-model
+stop = None
+
+# Models checked between looks at the stop flag
+STOP_EVERY = 4096
+
+# Partial models evaluated by model_check and model_check_many in this process
+models_evaluated = 0
 
 
 class Sentence():
+    __slots__ = ("_hash", "_symbols", "_shared", "__weakref__")
+
+    # Every Symbol, Not, Or, Implication and Biconditional in use, keyed by
+    # class and the identity of its parts, so equal sentences share one node
+    interned = weakref.WeakValueDictionary()
+
+    @classmethod
+    def intern(cls, *parts):
+        """Returns the node of this class with these parts, creating it if
+        there is none yet. Nodes above an And, which is never shared, are
+        not interned either."""
+        shared = all(part._shared for part in parts
+                     if isinstance(part, Sentence))
+        if shared:
+            key = (cls,) + tuple(id(part) if isinstance(part, Sentence)
+                                 else part for part in parts)
+            node = Sentence.interned.get(key)
+            if node is not None:
+                return node
+        node = object.__new__(cls)
+        node.build(*parts)
+        node._shared = shared
+        if shared:
+            Sentence.interned[key] = node
+        return node
+
+    def __hash__(self):
+        return self._hash
+
+    def __reduce__(self):
+        return type(self), self.parts()
+
+    def parts(self):
+        """Returns the arguments the sentence was constructed from."""
+        return ()
 
     def evaluate(self, model):
         """Evaluates the logical sentence."""
         raise Exception("nothing to evaluate")
 
+    def evaluate_partial(self, model):
+        """Evaluates the logical sentence under a model that may leave some
+        symbols out: True or False if every completion of the model agrees,
+        None if it depends on the missing symbols."""
+        raise Exception("nothing to evaluate")
+
     def formula(self):
         """Returns string formula representing logical sentence."""
         return ""
 
     def symbols(self):
         """Returns a set of all symbols in the logical sentence."""
-        return set()
+        return set(self.symbol_set())
+
+    def symbol_set(self):
+        """Returns the symbols of the sentence as a frozenset, worked out
+        on first use and kept."""
+        if self._symbols is None:
+            self._symbols = frozenset().union(
+                *[part.symbol_set() for part in self.parts()]
+            )
+        return self._symbols
+
+    def python(self, names):
+        """Returns a Python expression for the sentence, given a dict
+        mapping each symbol to the name of a boolean variable."""
+        raise Exception("nothing to compile")
+
+    def compile(self, symbols):
+        """Returns a function of one boolean per symbol, in the order of
+        `symbols`, that evaluates the sentence."""
+        names = {symbol: f"p{i}" for i, symbol in enumerate(symbols)}
+        arguments = ", ".join(names.values())
+        return eval(f"lambda {arguments}: {self.python(names)}")
 
     @classmethod
     def validate(cls, sentence):
@@ -43,15 +126,25 @@ class Sentence():
 
 
 class Symbol(Sentence):
+    __slots__ = ("name",)
+
+    def __new__(cls, name):
+        return cls.intern(name)
 
-    def __init__(self, name):
+    def build(self, name):
         self.name = name
+        self._hash = hash(("symbol", name))
+        self._symbols = frozenset([name])
+
+    def parts(self):
+        return (self.name,)
 
     def __eq__(self, other):
-        return isinstance(other, Symbol) and self.name == other.name
+        return self is other or (
+            isinstance(other, Symbol) and self.name == other.name
+        )
 
-    def __hash__(self):
-        return hash(("symbol", self.name))
+    __hash__ = Sentence.__hash__
 
     def __repr__(self):
         return self.name
@@ -62,23 +155,40 @@ class Symbol(Sentence):
         except KeyError:
             raise Exception(f"variable {self.name} not in model")
 
+    def evaluate_partial(self, model):
+        return model.get(self.name)
+
     def formula(self):
         return self.name
 
-    def symbols(self):
-        return {self.name}
+    def python(self, names):
+        try:
+            return names[self.name]
+        except KeyError:
+            raise Exception(f"variable {self.name} not in model")
 
 
 class Not(Sentence):
-    def __init__(self, operand):
+    __slots__ = ("operand",)
+
+    def __new__(cls, operand):
         Sentence.validate(operand)
+        return cls.intern(operand)
+
+    def build(self, operand):
         self.operand = operand
+        self._hash = hash(("not", hash(operand)))
+        self._symbols = None
+
+    def parts(self):
+        return (self.operand,)
 
     def __eq__(self, other):
-        return isinstance(other, Not) and self.operand == other.operand
+        return self is other or (
+            isinstance(other, Not) and self.operand == other.operand
+        )
 
-    def __hash__(self):
-        return hash(("not", hash(self.operand)))
+    __hash__ = Sentence.__hash__
 
     def __repr__(self):
         return f"Not({self.operand})"
@@ -86,26 +196,45 @@ class Not(Sentence):
     def evaluate(self, model):
         return not self.operand.evaluate(model)
 
+    def evaluate_partial(self, model):
+        value = self.operand.evaluate_partial(model)
+        return None if value is None else not value
+
     def formula(self):
         return "¬" + Sentence.parenthesize(self.operand.formula())
 
-    def symbols(self):
-        return self.operand.symbols()
+    def python(self, names):
+        return f"(not {self.operand.python(names)})"
 
 
 class And(Sentence):
+    """Conjunction of sentences. Because `add` extends it in place, every
+    And is a node of its own rather than an interned one, and an And should
+    not be extended once it is part of another sentence."""
+    __slots__ = ("conjuncts",)
+
     def __init__(self, *conjuncts):
         for conjunct in conjuncts:
             Sentence.validate(conjunct)
         self.conjuncts = list(conjuncts)
+        self._hash = None
+        self._symbols = None
+        self._shared = False
+
+    def parts(self):
+        return tuple(self.conjuncts)
 
     def __eq__(self, other):
-        return isinstance(other, And) and self.conjuncts == other.conjuncts
+        return self is other or (
+            isinstance(other, And) and self.conjuncts == other.conjuncts
+        )
 
     def __hash__(self):
-        return hash(
-            ("and", tuple(hash(conjunct) for conjunct in self.conjuncts))
-        )
+        if self._hash is None:
+            self._hash = hash(
+                ("and", tuple(hash(conjunct) for conjunct in self.conjuncts))
+            )
+        return self._hash
 
     def __repr__(self):
         conjunctions = ", ".join(
@@ -116,34 +245,62 @@ class And(Sentence):
     def add(self, conjunct):
         Sentence.validate(conjunct)
         self.conjuncts.append(conjunct)
+        self._hash = None
+        if self._symbols is not None:
+            self._symbols = self._symbols | conjunct.symbol_set()
 
     def evaluate(self, model):
         return all(conjunct.evaluate(model) for conjunct in self.conjuncts)
 
+    def evaluate_partial(self, model):
+        result = True
+        for conjunct in self.conjuncts:
+            value = conjunct.evaluate_partial(model)
+            if value is False:
+                return False
+            if value is None:
+                result = None
+        return result
+
     def formula(self):
         if len(self.conjuncts) == 1:
             return self.conjuncts[0].formula()
         return " ∧ ".join([Sentence.parenthesize(conjunct.formula())
                            for conjunct in self.conjuncts])
 
-    def symbols(self):
-        return set.union(*[conjunct.symbols() for conjunct in self.conjuncts])
+    def python(self, names):
+        if not self.conjuncts:
+            return "True"
+        return "(" + " and ".join(
+            [conjunct.python(names) for conjunct in self.conjuncts]
+        ) + ")"
 
 
 class Or(Sentence):
-    def __init__(self, *disjuncts):
+    __slots__ = ("disjuncts",)
+
+    def __new__(cls, *disjuncts):
         for disjunct in disjuncts:
             Sentence.validate(disjunct)
+        return cls.intern(*disjuncts)
+
+    def build(self, *disjuncts):
         self.disjuncts = list(disjuncts)
+        self._hash = hash(
+            ("or", tuple(hash(disjunct) for disjunct in disjuncts))
+        )
+        self._symbols = None
 
-    def __eq__(self, other):
-        return isinstance(other, Or) and self.disjuncts == other.disjuncts
+    def parts(self):
+        return tuple(self.disjuncts)
 
-    def __hash__(self):
-        return hash(
-            ("or", tuple(hash(disjunct) for disjunct in self.disjuncts))
+    def __eq__(self, other):
+        return self is other or (
+            isinstance(other, Or) and self.disjuncts == other.disjuncts
         )
 
+    __hash__ = Sentence.__hash__
+
     def __repr__(self):
         disjuncts = ", ".join([str(disjunct) for disjunct in self.disjuncts])
         return f"Or({disjuncts})"
@@ -151,30 +308,55 @@ class Or(Sentence):
     def evaluate(self, model):
         return any(disjunct.evaluate(model) for disjunct in self.disjuncts)
 
+    def evaluate_partial(self, model):
+        result = False
+        for disjunct in self.disjuncts:
+            value = disjunct.evaluate_partial(model)
+            if value is True:
+                return True
+            if value is None:
+                result = None
+        return result
+
     def formula(self):
         if len(self.disjuncts) == 1:
             return self.disjuncts[0].formula()
         return " ∨  ".join([Sentence.parenthesize(disjunct.formula())
                             for disjunct in self.disjuncts])
 
-    def symbols(self):
-        return set.union(*[disjunct.symbols() for disjunct in self.disjuncts])
+    def python(self, names):
+        if not self.disjuncts:
+            return "False"
+        return "(" + " or ".join(
+            [disjunct.python(names) for disjunct in self.disjuncts]
+        ) + ")"
 
 
 class Implication(Sentence):
-    def __init__(self, antecedent, consequent):
+    __slots__ = ("antecedent", "consequent")
+
+    def __new__(cls, antecedent, consequent):
         Sentence.validate(antecedent)
         Sentence.validate(consequent)
+        return cls.intern(antecedent, consequent)
+
+    def build(self, antecedent, consequent):
         self.antecedent = antecedent
         self.consequent = consequent
+        self._hash = hash(("implies", hash(antecedent), hash(consequent)))
+        self._symbols = None
+
+    def parts(self):
+        return (self.antecedent, self.consequent)
 
     def __eq__(self, other):
-        return (isinstance(other, Implication)
-                and self.antecedent == other.antecedent
-                and self.consequent == other.consequent)
+        return self is other or (
+            isinstance(other, Implication)
+            and self.antecedent == other.antecedent
+            and self.consequent == other.consequent
+        )
 
-    def __hash__(self):
-        return hash(("implies", hash(self.antecedent), hash(self.consequent)))
+    __hash__ = Sentence.__hash__
 
     def __repr__(self):
         return f"Implication({self.antecedent}, {self.consequent})"
@@ -183,29 +365,53 @@ class Implication(Sentence):
         return ((not self.antecedent.evaluate(model))
                 or self.consequent.evaluate(model))
 
+    def evaluate_partial(self, model):
+        antecedent = self.antecedent.evaluate_partial(model)
+        if antecedent is False:
+            return True
+        consequent = self.consequent.evaluate_partial(model)
+        if consequent is True:
+            return True
+        if antecedent is None or consequent is None:
+            return None
+        return False
+
     def formula(self):
         antecedent = Sentence.parenthesize(self.antecedent.formula())
         consequent = Sentence.parenthesize(self.consequent.formula())
         return f"{antecedent} => {consequent}"
 
-    def symbols(self):
-        return set.union(self.antecedent.symbols(), self.consequent.symbols())
+    def python(self, names):
+        antecedent = self.antecedent.python(names)
+        consequent = self.consequent.python(names)
+        return f"(not {antecedent} or {consequent})"
 
 
 class Biconditional(Sentence):
-    def __init__(self, left, right):
+    __slots__ = ("left", "right")
+
+    def __new__(cls, left, right):
         Sentence.validate(left)
         Sentence.validate(right)
+        return cls.intern(left, right)
+
+    def build(self, left, right):
         self.left = left
         self.right = right
+        self._hash = hash(("biconditional", hash(left), hash(right)))
+        self._symbols = None
+
+    def parts(self):
+        return (self.left, self.right)
 
     def __eq__(self, other):
-        return (isinstance(other, Biconditional)
-                and self.left == other.left
-                and self.right == other.right)
+        return self is other or (
+            isinstance(other, Biconditional)
+            and self.left == other.left
+            and self.right == other.right
+        )
 
-    def __hash__(self):
-        return hash(("biconditional", hash(self.left), hash(self.right)))
+    __hash__ = Sentence.__hash__
 
     def __repr__(self):
         return f"Biconditional({self.left}, {self.right})"
@@ -216,48 +422,219 @@ class Biconditional(Sentence):
                 or (not self.left.evaluate(model)
                     and not self.right.evaluate(model)))
 
+    def evaluate_partial(self, model):
+        left = self.left.evaluate_partial(model)
+        if left is None:
+            return None
+        right = self.right.evaluate_partial(model)
+        if right is None:
+            return None
+        return left == right
+
     def formula(self):
         left = Sentence.parenthesize(str(self.left))
         right = Sentence.parenthesize(str(self.right))
         return f"{left} <=> {right}"
 
-    def symbols(self):
-        return set.union(self.left.symbols(), self.right.symbols())
-
+    def python(self, names):
+        return f"({self.left.python(names)} == {self.right.python(names)})"
 
-def model_check(knowledge, query):
-    """Checks if knowledge base entails query."""
 
-    def check_all(knowledge, query, symbols, model):
-        """Checks if knowledge base entails query, given a particular model."""
+def model_check(knowledge, query, compiled=False, sat=False, workers=None,
+                split=None):
+    """Checks if knowledge base entails query.
 
-        # If model has an assignment for each symbol
-        if not symbols:
-
-            # If knowledge base is true in model, then query must also be true
-            if knowledge.evaluate(model):
-                return query.evaluate(model)
-            return True
-        else:
-
-            # Choose one of the remaining unused symbols
-            remaining = symbols.copy()
-            p = remaining.pop()
-
-            # Create a model where the symbol is true
-            model_true = model.copy()
-            model_true[p] = True
-
-            # Create a model where the symbol is false
-            model_false = model.copy()
-            model_false[p] = False
-
-            # Ensure entailment holds in both models
-            return (check_all(knowledge, query, remaining, model_true) and
-                    check_all(knowledge, query, remaining, model_false))
+    Symbols are assigned one at a time in a single model dict, and a
+    branch is abandoned as soon as the partial model makes the knowledge
+    base false or the query true. If `workers` is given, the assignments
+    to the first `split` symbols are checked in that many processes.
+    If `compiled` is set, the knowledge base and query are instead
+    compiled to one Python function that is called on every model.
+    If `sat` is set, the check is handed to the SAT solver in sat.py."""
+    if sat:
+        import sat as solver
+        return solver.entails(knowledge, query)
 
     # Get all symbols in both knowledge and query
     symbols = set.union(knowledge.symbols(), query.symbols())
 
-    # Check that knowledge entails query
-    return check_all(knowledge, query, symbols, dict())
+    if not compiled:
+        # Check that knowledge entails query, its conjuncts one by one
+        conjuncts = (knowledge.conjuncts if isinstance(knowledge, And)
+                     else [knowledge])
+        if workers is not None:
+            return check_parallel(conjuncts, query, sorted(symbols),
+                                  workers, split)
+        return check_all(conjuncts, query, sorted(symbols), dict())
+
+    # Check that the query holds in every model where knowledge does
+    holds = Implication(knowledge, query).compile(sorted(symbols))
+    return all(itertools.starmap(
+        holds, itertools.product((True, False), repeat=len(symbols))
+    ))
+
+
+def check_all(pending, query, symbols, model):
+    """Checks if knowledge base entails query, given a partial model
+    and the conjuncts of the knowledge base it does not yet make true."""
+    global models_evaluated
+    models_evaluated += 1
+    if (stop is not None and models_evaluated % STOP_EVERY == 0
+            and stop.is_set()):
+        raise Cancelled
+
+    # Conjuncts already true stay true in every completion of the model
+    remaining = []
+    for conjunct in pending:
+        value = conjunct.evaluate_partial(model)
+        if value is False:
+            return True
+        if value is None:
+            remaining.append(conjunct)
+
+    # If the query is decided, so is entailment in every completion
+    value = query.evaluate_partial(model)
+    if value is True:
+        return True
+    if value is False and not remaining:
+        return False
+
+    # Try the next symbol both ways, taking the assignment back after
+    p = symbols[len(model)]
+    for truth in (True, False):
+        model[p] = truth
+        holds = check_all(remaining, query, symbols, model)
+        del model[p]
+        if not holds:
+            return False
+    return True
+
+
+def check_parallel(conjuncts, query, symbols, workers, split=None):
+    """Checks entailment like check_all from an empty model, with each
+    assignment to the first `split` symbols checked in a process pool.
+    Stops as soon as one of them has a counter-model: assignments not yet
+    started are cancelled and running ones see the stop flag and quit."""
+    if split is None:
+        split = (4 * workers).bit_length()
+    split = min(split, len(symbols))
+
+    halt = multiprocessing.Event()
+    executor = ProcessPoolExecutor(
+        workers, initializer=init_worker,
+        initargs=(conjuncts, query, symbols, halt)
+    )
+    try:
+        futures = [executor.submit(check_prefix, prefix) for prefix
+                   in itertools.product((True, False), repeat=split)]
+        for future in as_completed(futures):
+            if not future.result():
+                halt.set()
+                return False
+        return True
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+class Cancelled(Exception):
+    pass
+
+
+def init_worker(conjuncts, query, symbols, halt):
+    """Gives a worker process the entailment problem it checks parts of,
+    and the flag that tells it to give up."""
+    global problem, stop
+    problem = (conjuncts, query, symbols)
+    stop = halt
+
+
+def check_prefix(prefix):
+    """Checks entailment in the worker's problem for the models whose
+    first symbols take the values in `prefix`."""
+    conjuncts, query, symbols = problem
+    model = dict(zip(symbols, prefix))
+    try:
+        return check_all(conjuncts, query, symbols, model)
+    except Cancelled:
+        return True
+
+
+def model_check_many(knowledge, queries):
+    """Checks which queries the knowledge base entails, returning a list
+    of booleans in the order of `queries`.
+
+    The models of the knowledge base are enumerated once and every query
+    is checked against them, and they are kept for later calls with an
+    equal knowledge base."""
+    symbols = knowledge.symbol_set()
+    models = satisfying_models(knowledge)
+    results = []
+    for query in queries:
+        if query.symbol_set() <= symbols:
+            query_symbols = sorted(query.symbol_set())
+            results.append(all(
+                holds_in_all(query, model, [symbol for symbol in query_symbols
+                                            if symbol not in model])
+                for model in models
+            ))
+        else:
+            results.append(model_check(knowledge, query))
+    return results
+
+
+def satisfying_models(knowledge):
+    """Returns the models of the knowledge base as partial models, each of
+    which makes the knowledge base true whatever the symbols it leaves out."""
+    key = (type(knowledge),) + knowledge.parts()
+    if key in satisfying:
+        return satisfying[key]
+
+    symbols = sorted(knowledge.symbol_set())
+    models = []
+
+    def enumerate_all(pending, model):
+        """Adds every model extending a partial model, given the conjuncts
+        of the knowledge base it does not yet make true."""
+        global models_evaluated
+        models_evaluated += 1
+        remaining = []
+        for conjunct in pending:
+            value = conjunct.evaluate_partial(model)
+            if value is False:
+                return
+            if value is None:
+                remaining.append(conjunct)
+        if not remaining:
+            models.append(model.copy())
+            return
+
+        p = symbols[len(model)]
+        for truth in (True, False):
+            model[p] = truth
+            enumerate_all(remaining, model)
+            del model[p]
+
+    conjuncts = (knowledge.conjuncts if isinstance(knowledge, And)
+                 else [knowledge])
+    enumerate_all(conjuncts, dict())
+
+    if len(satisfying) >= SATISFYING_LIMIT:
+        del satisfying[next(iter(satisfying))]
+    satisfying[key] = models
+    return models
+
+
+def holds_in_all(sentence, model, free):
+    """Checks if a sentence is true in every completion of a partial model,
+    given `free`, the symbols of the sentence the model leaves out."""
+    value = sentence.evaluate_partial(model)
+    if value is not None:
+        return value
+    p = free[0]
+    for truth in (True, False):
+        model[p] = truth
+        holds = holds_in_all(sentence, model, free[1:])
+        del model[p]
+        if not holds:
+            return False
+    return True
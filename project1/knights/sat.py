@@ -0,0 +1,286 @@
+"""SAT backend for entailment checks.
+
+Sentences are converted to conjunctive normal form with the Tseitin
+encoding, which adds one variable per compound subsentence instead of
+distributing, so the CNF grows linearly with the sentence. A CDCL solver
+(unit propagation over two watched literals, first-UIP clause learning,
+non-chronological backjumping and activity-based branching) then decides
+satisfiability. KB entails query exactly when KB ∧ ¬query is unsatisfiable.
+"""
+
+from logic import And, Or, Not, Implication, Biconditional, Symbol
+
+
+class CNF():
+    """Clauses over integer variables, built up one sentence at a time.
+
+    A literal is a variable number, negated for the variable being false.
+    """
+
+    def __init__(self):
+        self.variables = {}
+        self.count = 0
+        self.clauses = []
+        self.literals = {}
+
+    def variable(self, name):
+        """Returns the variable of a symbol name, creating it if needed."""
+        if name not in self.variables:
+            self.count += 1
+            self.variables[name] = self.count
+        return self.variables[name]
+
+    def fresh(self):
+        """Returns a new variable with no symbol."""
+        self.count += 1
+        return self.count
+
+    def add(self, sentence):
+        """Adds clauses that hold exactly when the sentence does."""
+        if isinstance(sentence, And):
+            for conjunct in sentence.conjuncts:
+                self.add(conjunct)
+        elif isinstance(sentence, Or):
+            self.clauses.append(
+                [self.literal(disjunct) for disjunct in sentence.disjuncts]
+            )
+        elif isinstance(sentence, Implication):
+            self.clauses.append([-self.literal(sentence.antecedent),
+                                 self.literal(sentence.consequent)])
+        else:
+            self.clauses.append([self.literal(sentence)])
+
+    def literal(self, sentence):
+        """Returns a literal that is true exactly when the sentence is."""
+        if isinstance(sentence, Symbol):
+            return self.variable(sentence.name)
+        if isinstance(sentence, Not):
+            return -self.literal(sentence.operand)
+        if sentence in self.literals:
+            return self.literals[sentence]
+
+        x = self.fresh()
+        if isinstance(sentence, And):
+            parts = [self.literal(conjunct) for conjunct in sentence.conjuncts]
+            self.clauses.extend([-x, part] for part in parts)
+            self.clauses.append([x] + [-part for part in parts])
+        elif isinstance(sentence, (Or, Implication)):
+            if isinstance(sentence, Or):
+                parts = [self.literal(disjunct)
+                         for disjunct in sentence.disjuncts]
+            else:
+                parts = [-self.literal(sentence.antecedent),
+                         self.literal(sentence.consequent)]
+            self.clauses.append([-x] + parts)
+            self.clauses.extend([x, -part] for part in parts)
+        elif isinstance(sentence, Biconditional):
+            a = self.literal(sentence.left)
+            b = self.literal(sentence.right)
+            self.clauses.extend([
+                [-x, -a, b], [-x, a, -b], [x, a, b], [x, -a, -b]
+            ])
+        else:
+            raise TypeError("must be a logical sentence")
+        self.literals[sentence] = x
+        return x
+
+
+class Solver():
+    """CDCL search for an assignment satisfying every clause."""
+
+    def __init__(self, clauses, count):
+        self.count = count
+        self.value = [0] * (count + 1)
+        self.level = [0] * (count + 1)
+        self.reason = [None] * (count + 1)
+        self.phase = [-1] * (count + 1)
+        self.activity = [0.0] * (count + 1)
+        self.increment = 1.0
+        self.watches = {}
+        self.trail = []
+        self.limits = []
+        self.head = 0
+        self.decisions = 0
+        self.conflicts = 0
+
+        self.units = []
+        self.empty = False
+        for clause in clauses:
+            clause = list(dict.fromkeys(clause))
+            if any(-literal in clause for literal in clause):
+                continue
+            if not clause:
+                self.empty = True
+            elif len(clause) == 1:
+                self.units.append(clause[0])
+            else:
+                self.watch(clause)
+
+    def watch(self, clause):
+        """Watches the first two literals of a clause."""
+        self.watches.setdefault(clause[0], []).append(clause)
+        self.watches.setdefault(clause[1], []).append(clause)
+
+    def truth(self, literal):
+        """Returns 1 if a literal is true, -1 if false, 0 if unassigned."""
+        value = self.value[abs(literal)]
+        return value if literal > 0 else -value
+
+    def assign(self, literal, reason):
+        """Makes a literal true at the current decision level."""
+        variable = abs(literal)
+        self.value[variable] = 1 if literal > 0 else -1
+        self.level[variable] = len(self.limits)
+        self.reason[variable] = reason
+        self.trail.append(literal)
+
+    def propagate(self):
+        """Assigns every literal forced by a unit clause. Returns a clause
+        with every literal false if there is one, None otherwise."""
+        while self.head < len(self.trail):
+            false = -self.trail[self.head]
+            self.head += 1
+            watchers = self.watches.get(false, [])
+            kept = []
+            for index, clause in enumerate(watchers):
+                if clause[0] == false:
+                    clause[0], clause[1] = clause[1], clause[0]
+                if self.truth(clause[0]) == 1:
+                    kept.append(clause)
+                    continue
+
+                # look for another literal to watch
+                for k in range(2, len(clause)):
+                    if self.truth(clause[k]) != -1:
+                        clause[1], clause[k] = clause[k], clause[1]
+                        self.watches.setdefault(clause[1], []).append(clause)
+                        break
+                else:
+                    kept.append(clause)
+                    if self.truth(clause[0]) == -1:
+                        kept.extend(watchers[index + 1:])
+                        self.watches[false] = kept
+                        return clause
+                    self.assign(clause[0], clause)
+            self.watches[false] = kept
+        return None
+
+    def analyze(self, conflict):
+        """Returns (learned clause, level to backjump to) for a conflict,
+        learning the first unique implication point clause."""
+        level = len(self.limits)
+        seen = set()
+        learned = []
+        pending = 0
+        literal = None
+        clause = conflict
+        index = len(self.trail) - 1
+        while True:
+            for other in clause:
+                variable = abs(other)
+                if other == literal or variable in seen or not self.level[variable]:
+                    continue
+                seen.add(variable)
+                self.bump(variable)
+                if self.level[variable] == level:
+                    pending += 1
+                else:
+                    learned.append(other)
+            while abs(self.trail[index]) not in seen:
+                index -= 1
+            literal = self.trail[index]
+            index -= 1
+            pending -= 1
+            if not pending:
+                break
+            clause = self.reason[abs(literal)]
+
+        # asserting literal first, then the deepest of the rest to watch
+        learned.insert(0, -literal)
+        if len(learned) == 1:
+            return learned, 0
+        deepest = max(range(1, len(learned)),
+                      key=lambda i: self.level[abs(learned[i])])
+        learned[1], learned[deepest] = learned[deepest], learned[1]
+        return learned, self.level[abs(learned[1])]
+
+    def bump(self, variable):
+        """Raises a variable's branching activity."""
+        self.activity[variable] += self.increment
+        if self.activity[variable] > 1e100:
+            self.activity = [activity * 1e-100 for activity in self.activity]
+            self.increment *= 1e-100
+
+    def backjump(self, level):
+        """Undoes every assignment above a decision level."""
+        while len(self.trail) > self.limits[level]:
+            variable = abs(self.trail.pop())
+            self.phase[variable] = self.value[variable]
+            self.value[variable] = 0
+            self.reason[variable] = None
+        del self.limits[level:]
+        self.head = len(self.trail)
+
+    def decide(self):
+        """Returns the most active unassigned variable, None if all are
+        assigned."""
+        best = None
+        for variable in range(1, self.count + 1):
+            if not self.value[variable] and (
+                    best is None or self.activity[variable] > self.activity[best]):
+                best = variable
+        return best
+
+    def solve(self):
+        """Returns a satisfying assignment as a list of 1 or -1 indexed by
+        variable, or None if the clauses are unsatisfiable."""
+        if self.empty:
+            return None
+        for unit in self.units:
+            if self.truth(unit) == -1:
+                return None
+            if not self.truth(unit):
+                self.assign(unit, None)
+
+        while True:
+            conflict = self.propagate()
+            if conflict is not None:
+                self.conflicts += 1
+                if not self.limits:
+                    return None
+                learned, level = self.analyze(conflict)
+                self.backjump(level)
+                if len(learned) == 1:
+                    self.assign(learned[0], None)
+                else:
+                    self.watch(learned)
+                    self.assign(learned[0], learned)
+                self.increment /= 0.95
+                continue
+
+            variable = self.decide()
+            if variable is None:
+                return self.value
+            self.decisions += 1
+            self.limits.append(len(self.trail))
+            self.assign(variable * self.phase[variable], None)
+
+
+def satisfy(sentence):
+    """Returns a model of the sentence, a dict from symbol name to bool,
+    or None if it is unsatisfiable."""
+    cnf = CNF()
+    cnf.add(sentence)
+    value = Solver(cnf.clauses, cnf.count).solve()
+    if value is None:
+        return None
+    return {name: value[variable] == 1
+            for name, variable in cnf.variables.items()}
+
+
+def entails(knowledge, query):
+    """Checks if knowledge base entails query."""
+    cnf = CNF()
+    cnf.add(knowledge)
+    cnf.add(Not(query))
+    return Solver(cnf.clauses, cnf.count).solve() is None